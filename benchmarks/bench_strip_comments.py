@@ -0,0 +1,76 @@
+"""Comment stripping benchmark.
+
+Measures ``format(sql, strip_comments=True)`` on a ``CREATE TABLE``
+statement with a comment per column, as generated schema files have.
+``StripCommentsFilter`` used to insert and remove tokens in place and
+search for the next comment from scratch after each one, giving O(n^2)
+total work for n comments in a single statement.
+
+Both ways to strip comments are measured: on plain tokens, when no other
+option needs grouping, and on grouped statements.  Grouping rejects the
+larger statements, so the last vector groups them upfront with the limit
+lifted and measures stripping the comments from the parenthesis holding
+the columns on its own.
+
+Run with:  python benchmarks/bench_strip_comments.py
+"""
+
+import gc
+import sys
+
+from _harness import Vector, main
+
+import sqlparse
+from sqlparse.engine import grouping
+from sqlparse.filters import StripCommentsFilter
+
+
+def annotated_table(n):
+    columns = ',\n'.join(
+        f'  col_{i} INTEGER /* column {i} */ NOT NULL -- note {i}'
+        for i in range(n))
+    return f'CREATE TABLE t (\n{columns}\n);'
+
+
+# Grouped columns by payload, see grouped_table().
+_columns = {}
+
+
+def grouped_table(n):
+    sql = annotated_table(n)
+    limit = grouping.MAX_GROUPING_TOKENS
+    grouping.MAX_GROUPING_TOKENS = None
+    try:
+        stmt = sqlparse.parse(sql)[0]
+    finally:
+        grouping.MAX_GROUPING_TOKENS = limit
+    _columns[sql] = stmt.token_next_by(i=sqlparse.sql.Parenthesis)[1]
+    return sql
+
+
+def strip_grouped(sql):
+    # Collections would traverse the large trees built upfront.
+    gc.disable()
+    try:
+        StripCommentsFilter._process(_columns.pop(sql))
+    finally:
+        gc.enable()
+
+
+SIZES = (1000, 2000, 4000, 8000)
+# Grouping rejects statements with more than MAX_GROUPING_TOKENS tokens.
+GROUPED_SIZES = (100, 200, 400)
+
+VECTORS = [
+    Vector('format strip_comments=True', annotated_table, SIZES,
+           lambda sql: sqlparse.format(sql, strip_comments=True)),
+    Vector('format strip_comments=True, strip_whitespace=True',
+           annotated_table, GROUPED_SIZES,
+           lambda sql: sqlparse.format(sql, strip_comments=True,
+                                       strip_whitespace=True)),
+    Vector('StripCommentsFilter on grouped columns', grouped_table, SIZES,
+           strip_grouped),
+]
+
+if __name__ == '__main__':
+    sys.exit(main('comment stripping', VECTORS, argv=sys.argv[1:]))
@@ -0,0 +1,107 @@
+"""Parse tree memory benchmark.
+
+Measures the memory held by parsed statements: a schema of n ``CREATE
+TABLE`` statements and n queries are parsed and the allocations still
+alive afterwards are attributed to the tree nodes.  Every node class
+declares ``__slots__``; a class that misses them gives each of its
+instances a ``__dict__`` of its own, which shows up here as additional
+bytes per node.
+
+For comparison the memory of the same statements in compact form, as
+returned by ``sqlparse.parse_compact()``, is reported too.
+
+Unlike the timing benchmarks there's no scaling verdict -- memory grows
+linearly with the input anyway.  The script exits non-zero if any node
+in the trees carries a ``__dict__``.
+
+Run with:  python benchmarks/bench_tree_memory.py
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+import sqlparse
+
+
+def schema(n):
+    return '\n'.join(
+        f'CREATE TABLE t{i} (id INTEGER PRIMARY KEY, name VARCHAR(40) '
+        f'NOT NULL, parent_id INTEGER REFERENCES t{i // 2} (id), '
+        f'created TIMESTAMP DEFAULT now());'
+        for i in range(n))
+
+
+def queries(n):
+    return '\n'.join(
+        f'SELECT a.id, a.name AS label, count(b.id) FROM t{i} a '
+        f'LEFT JOIN t{i // 2} b ON b.parent_id = a.id '
+        f"WHERE a.name LIKE 'x%' AND a.created > '2020-01-01' "
+        f'GROUP BY a.id, a.name ORDER BY 3 DESC;'
+        for i in range(n))
+
+
+WORKLOADS = [('schema', schema), ('queries', queries)]
+SIZES = (100, 200, 400)
+
+
+def _nodes(stmts):
+    stack = list(stmts)
+    while stack:
+        token = stack.pop()
+        yield token
+        if token.is_group:
+            stack.extend(token.tokens)
+
+
+def _retained(parse, sql):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = parse(sql)
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def measure(sql):
+    """Parse ``sql``, return ``(retained bytes, retained bytes in compact
+    form, nodes, nodes with dict)``."""
+    stmts, retained = _retained(sqlparse.parse, sql)
+    _, compact = _retained(sqlparse.parse_compact, sql)
+    nodes = list(_nodes(stmts))
+    with_dict = sum(1 for token in nodes if hasattr(token, '__dict__'))
+    return retained, compact, len(nodes), with_dict
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='sqlparse benchmark: parse tree memory',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--sizes', type=lambda s: tuple(int(p) for p in s.split(',')),
+        default=SIZES, help='comma-separated sizes')
+    args = parser.parse_args(argv)
+
+    print('sqlparse benchmark: parse tree memory\n')
+    failed = False
+    for name, build in WORKLOADS:
+        print(f'{name}:')
+        print(f'  {"n":>8}  {"input":>9}  {"nodes":>8}  {"retained":>10}  '
+              f'{"per node":>9}  {"compact":>9}  with __dict__')
+        for n in args.sizes:
+            sql = build(n)
+            retained, compact, nodes, with_dict = measure(sql)
+            print(f'  {n:>8}  {len(sql) / 1000:>6.1f} kB  {nodes:>8}  '
+                  f'{retained / 1000:>7.1f} kB  {retained / nodes:>7.1f} B  '
+                  f'{compact / nodes:>7.1f} B  {with_dict}')
+            failed = failed or with_dict > 0
+        print()
+
+    print('verdict: ' + ('nodes with __dict__ found' if failed
+                         else 'no node carries a __dict__'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
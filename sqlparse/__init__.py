@@ -8,33 +8,81 @@
 """Parse SQL statements."""
 
 # Setup namespace
-from collections.abc import Generator
+import hashlib
+import os
+from collections.abc import Generator, Iterable
+from functools import partial
 from typing import IO, Any
 
-from sqlparse import cli, engine, filters, formatter, sql, tokens
+from sqlparse import (
+    cache,
+    cli,
+    compact,
+    engine,
+    filters,
+    formatter,
+    lexer,
+    parallel,
+    sql,
+    tokens,
+    utils,
+)
+from sqlparse.formatter import Formatter
 
 __version__ = "0.6.1.dev0"
-__all__ = ["cli", "engine", "filters", "formatter", "sql", "tokens"]
+__all__ = ["cache", "cli", "compact", "engine", "filters", "formatter", "sql", "tokens"]
 
 
 def parse(
-    sql: str, encoding: str | None = None
+    sql: str | os.PathLike[str], encoding: str | None = None
 ) -> tuple[sql.Statement, ...]:
     """Parse sql and return a list of statements.
 
-    :param sql: A string containing one or more SQL statements.
+    :param sql: A string containing one or more SQL statements, or the path
+        of a file to read them from.
     :param encoding: The encoding of the statement (optional).
     :returns: A tuple of :class:`~sqlparse.sql.Statement` instances.
     """
+    if isinstance(sql, (str, bytes)):
+        return cache.cached(('parse', sql, encoding),
+                            lambda: tuple(parsestream(sql, encoding)),
+                            _copy_statements)
     return tuple(parsestream(sql, encoding))
 
 
+def _copy_statements(stmts):
+    return tuple(stmt._copy() for stmt in stmts)
+
+
+def parse_compact(
+    sql: str | IO[str] | os.PathLike[str], encoding: str | None = None
+) -> tuple[compact.CompactStatement, ...]:
+    """Parse sql and return a list of statements in compact form.
+
+    The statements are parsed like :func:`parse` does, but each is
+    converted to a :class:`~sqlparse.compact.CompactStatement` as soon as
+    it's complete. This form is read-only and takes a fraction of the
+    memory, which pays off when many parsed statements are kept around.
+
+    :param sql: A string containing one or more SQL statements, a
+        file-like object or the path of a file to read them from.
+    :param encoding: The encoding of the statement (optional).
+    :returns: A tuple of :class:`~sqlparse.compact.CompactStatement`
+        instances.
+    """
+    return tuple(compact.CompactStatement.from_statement(stmt)
+                 for stmt in parsestream(sql, encoding))
+
+
 def parsestream(
-    stream: str | IO[str], encoding: str | None = None
+    stream: str | IO[str] | os.PathLike[str], encoding: str | None = None
 ) -> Generator[sql.Statement, None, None]:
     """Parses sql statements from file-like object.
 
-    :param stream: A file-like object.
+    The stream is read in chunks and each statement is yielded as soon as
+    it's complete.
+
+    :param stream: A file-like object or the path of a file.
     :param encoding: The encoding of the stream contents (optional).
     :returns: A generator of :class:`~sqlparse.sql.Statement` instances.
     """
@@ -43,33 +91,193 @@ def parsestream(
     return stack.run(stream, encoding)
 
 
-def format(sql: str, encoding: str | None = None, **options: Any) -> str:
+def format(
+    sql: str | os.PathLike[str], encoding: str | None = None, **options: Any
+) -> str:
     """Format *sql* according to *options*.
 
-    Available options are documented in :ref:`formatting`.
+    *sql* is either a string or the path of a file to read the statements
+    from. Available options are documented in :ref:`formatting`.
 
     In addition to the formatting options this function accepts the
     keyword "encoding" which determines the encoding of the statement.
 
+    To format many statements with the same options, create a
+    :class:`~sqlparse.formatter.Formatter` once and reuse it instead.
+
     :returns: The formatted SQL statement as string.
     """
-    stack = engine.FilterStack()
-    options = formatter.validate_options(options)
-    stack = formatter.build_filter_stack(stack, options)
-    stack.postprocess.append(filters.SerializerUnicode())
-    return "".join(stack.run(sql, encoding))
+    if isinstance(sql, (str, bytes)):
+        # Looked up before setting up a formatter, which costs more than a
+        # hit.  The key matches the one of Formatter.format().
+        key = ('format', sql, encoding, tuple(sorted(options.items())))
+        return cache.cached(
+            key, lambda: Formatter(**options)._format(sql, encoding))
+    return Formatter(**options).format(sql, encoding)
 
 
 def split(
-    sql: str, encoding: str | None = None, strip_semicolon: bool = False
+    sql: str | os.PathLike[str],
+    encoding: str | None = None,
+    strip_semicolon: bool = False,
+    processes: int | None = 1,
 ) -> list[str]:
     """Split *sql* into single statements.
 
-    :param sql: A string containing one or more SQL statements.
+    :param sql: A string containing one or more SQL statements, or the path
+        of a file to read them from.
     :param encoding: The encoding of the statement (optional).
     :param strip_semicolon: If True, remove trailing semicolons
         (default: False).
+    :param processes: The number of worker processes, see
+        :func:`split_offsets`.
     :returns: A list of strings.
     """
+    if processes != 1 and isinstance(sql, os.PathLike):
+        sql = _read(sql, encoding)
+    if isinstance(sql, str):
+        # Fast path: statements are sliced from the text, no tokens needed.
+        return [sql[start:end] for start, end
+                in split_offsets(sql, strip_semicolon=strip_semicolon,
+                                 processes=processes)]
     stack = engine.FilterStack(strip_semicolon=strip_semicolon)
     return [str(stmt).strip() for stmt in stack.run(sql, encoding)]
+
+
+def split_offsets(
+    sql: str | os.PathLike[str],
+    encoding: str | None = None,
+    strip_semicolon: bool = False,
+    with_type: bool = False,
+    processes: int | None = 1,
+) -> list[tuple[int, int]] | list[tuple[int, int, str]]:
+    """Split *sql* into single statements and return their offsets.
+
+    The statements are the same :func:`split` returns, ``sql[start:end]``
+    being the statement at ``(start, end)``. For input other than a string
+    the offsets refer to the decoded text.
+
+    :param sql: A string containing one or more SQL statements, or the path
+        of a file to read them from.
+    :param encoding: The encoding of the statement (optional).
+    :param strip_semicolon: If True, leave out trailing semicolons
+        (default: False).
+    :param with_type: If True, add the statement type as returned by
+        :meth:`~sqlparse.sql.Statement.get_type` to each tuple
+        (default: False).
+    :param processes: The number of worker processes. With 1 (the
+        default) the statements are split in the current process, with
+        None one worker per CPU is started. Worker processes split large
+        scripts in chunks of at least a megabyte in parallel, reading a
+        file at once instead of in chunks.
+    :returns: A list of ``(start, end)`` tuples, or of
+        ``(start, end, type)`` tuples if *with_type* is True.
+    """
+    if processes != 1 and isinstance(sql, os.PathLike):
+        sql = _read(sql, encoding)
+    if processes != 1 and isinstance(sql, str):
+        return engine.statement_splitter.split_offsets_parallel(
+            sql, processes, strip_semicolon, with_type)
+    splitter = engine.StatementSplitter()
+    return list(splitter.process_offsets(
+        lexer.tokenize(sql, encoding), strip_semicolon, with_type))
+
+
+def _read(path, encoding):
+    """Reads the file at *path* like the lexer does, see get_tokens()."""
+    if encoding or utils.is_utf8(path):
+        with open(path, encoding=encoding or 'utf-8') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        return utils.decode(f.read())
+
+
+def fingerprint(
+    sql: str | os.PathLike[str], encoding: str | None = None
+) -> tuple[str, str]:
+    """Return the fingerprint of *sql*.
+
+    Statements differing only in their constants, comments, keyword case
+    or whitespace get the same fingerprint: literals are replaced by
+    ``?``, lists of them after ``IN`` and ``VALUES`` by ``(...)``, see
+    :class:`~sqlparse.filters.FingerprintFilter`. The statements are not
+    grouped, so this is cheap enough to run on every statement of a log.
+
+    :param sql: A string containing one or more SQL statements, or the path
+        of a file to read them from.
+    :param encoding: The encoding of the statement (optional).
+    :returns: A tuple of the normalized text and its hash as a string of 16
+        hexadecimal digits.
+    """
+    stream = filters.FingerprintFilter().process(lexer.tokenize(sql, encoding))
+    text = ''.join(value for _, value in stream)
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8)
+    return text, digest.hexdigest()
+
+
+def _map(func, sqls, processes, chunksize):
+    """Apply *func* to all *sqls*, optionally in a process pool."""
+    if processes == 1:
+        return [func(sql) for sql in sqls]
+    with parallel.process_pool(processes) as executor:
+        return list(executor.map(func, sqls, chunksize=chunksize))
+
+
+def parse_many(
+    sqls: Iterable[str],
+    encoding: str | None = None,
+    processes: int | None = 1,
+    chunksize: int = 100,
+) -> list[tuple[sql.Statement, ...]]:
+    """Parse each of *sqls* like :func:`parse` does.
+
+    :param sqls: An iterable of strings containing SQL statements.
+    :param encoding: The encoding of the statements (optional).
+    :param processes: The number of worker processes. With 1 (the
+        default) everything is parsed in the current process, with None
+        one worker per CPU is started.
+    :param chunksize: The number of strings sent to a worker at once.
+    :returns: A list with a tuple of :class:`~sqlparse.sql.Statement`
+        instances for each string, in the order of *sqls*.
+    """
+    return _map(partial(parse, encoding=encoding), sqls, processes, chunksize)
+
+
+def format_many(
+    sqls: Iterable[str],
+    encoding: str | None = None,
+    processes: int | None = 1,
+    chunksize: int = 100,
+    **options: Any,
+) -> list[str]:
+    """Format each of *sqls* according to *options* like :func:`format`
+    does.
+
+    The options are validated and the filters are set up once upfront,
+    see :class:`~sqlparse.formatter.Formatter`, and :func:`parse_many` for
+    the remaining arguments.
+
+    :returns: A list of formatted strings, in the order of *sqls*.
+    """
+    return _map(partial(Formatter(**options).format, encoding=encoding),
+                sqls, processes, chunksize)
+
+
+def split_many(
+    sqls: Iterable[str],
+    encoding: str | None = None,
+    strip_semicolon: bool = False,
+    processes: int | None = 1,
+    chunksize: int = 100,
+) -> list[list[str]]:
+    """Split each of *sqls* into single statements like :func:`split`
+    does.
+
+    See :func:`parse_many` for the remaining arguments.
+
+    :returns: A list with a list of strings for each string, in the order
+        of *sqls*.
+    """
+    return _map(partial(split, encoding=encoding,
+                        strip_semicolon=strip_semicolon),
+                sqls, processes, chunksize)
@@ -0,0 +1,141 @@
+#
+# Copyright (C) 2009-2020 the sqlparse authors and contributors
+# <see AUTHORS file>
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: https://opensource.org/licenses/BSD-3-Clause
+
+"""Result cache for :func:`sqlparse.parse` and :func:`sqlparse.format`.
+
+The cache is disabled by default.  Once enabled with :func:`enable`,
+results are memoized by SQL string, encoding and -- for
+:func:`sqlparse.format` -- formatting options, and the least recently
+used entries are evicted when the cache is full.  Input other than a
+string, e.g. a file, is never cached.
+
+Parsed statements are mutable, so :func:`sqlparse.parse` hands out a
+copy of the cached statements on every hit; changing them doesn't affect
+later results.  Copying is much cheaper than parsing.
+
+Changing the configuration of the lexer drops all cached results.
+"""
+
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from sqlparse.exceptions import SQLParseError
+
+CacheInfo = namedtuple(
+    'CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class LRUCache:
+    """A thread-safe mapping of limited size that evicts the least
+    recently used entries first."""
+
+    def __init__(self, maxsize):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise SQLParseError(f'Invalid cache size: {maxsize!r}')
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drops all entries, but keeps the statistics."""
+        with self._lock:
+            self._data.clear()
+
+    def clear(self):
+        """Drops all entries and resets the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._data))
+
+
+_cache = None
+
+
+def enable(maxsize=1024):
+    """Enables the cache for up to *maxsize* results.
+
+    Enabling the cache again replaces it by an empty one of the new size.
+    """
+    global _cache
+    _cache = LRUCache(maxsize)
+
+
+def disable():
+    """Disables the cache and drops all cached results."""
+    global _cache
+    _cache = None
+
+
+def is_enabled():
+    return _cache is not None
+
+
+def info():
+    """Returns the statistics of the cache as a named tuple with the fields
+    ``hits``, ``misses``, ``evictions``, ``maxsize`` and ``currsize``, or
+    ``None`` if the cache is disabled."""
+    cache = _cache
+    return cache.info() if cache is not None else None
+
+
+def clear():
+    """Drops all cached results and resets the statistics."""
+    cache = _cache
+    if cache is not None:
+        cache.clear()
+
+
+def invalidate():
+    """Drops all cached results, e.g. after the lexer was reconfigured."""
+    cache = _cache
+    if cache is not None:
+        cache.invalidate()
+
+
+def cached(key, func, copy=None):
+    """Returns the cached result for *key*, calling *func* on a miss.
+
+    Nothing is cached if the cache is disabled or *key* isn't hashable.
+    If given, *copy* is applied to the result before it's handed out.
+    """
+    cache = _cache
+    if cache is None:
+        return func()
+    try:
+        result = cache.get(key)
+    except TypeError:
+        # Unhashable formatting options.
+        return func()
+    if result is None:
+        result = func()
+        cache.put(key, result)
+    return copy(result) if copy is not None else result
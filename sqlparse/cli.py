@@ -18,8 +18,12 @@ Why does this file exist, and why not put this in __main__?
 """
 
 import argparse
+import os
 import sys
-from io import TextIOWrapper
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr
+from functools import partial
+from io import StringIO, TextIOWrapper
 
 import sqlparse
 from sqlparse.exceptions import SQLParseError
@@ -55,6 +59,14 @@ def create_parser():
         default=False,
         help='format files in-place (overwrite existing files)')
 
+    parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        metavar='N',
+        type=int,
+        default=1,
+        help='format up to N files in parallel (default 1)')
+
     parser.add_argument(
         '--version',
         action='version',
@@ -140,6 +152,13 @@ def create_parser():
         type=int,
         help='Column after which lists should be wrapped')
 
+    group.add_argument(
+        '--right_margin',
+        dest='right_margin',
+        default=None,
+        type=int,
+        help='maximum line length')
+
     group.add_argument(
         '--comma_first',
         dest='comma_first',
@@ -169,6 +188,13 @@ def _error(msg):
     return 1
 
 
+def _same_file(filename, outfile):
+    """Tells whether writing to outfile would overwrite filename."""
+    if filename == '-' or not outfile or not os.path.exists(outfile):
+        return False
+    return os.path.samefile(filename, outfile)
+
+
 def _process_file(filename, args):
     """Process a single file with the given formatting options.
 
@@ -178,52 +204,85 @@ def _process_file(filename, args):
     if filename == '-' and args.inplace:
         return _error('Cannot use --in-place with stdin')
 
-    # Read input
+    formatter_opts = vars(args)
+    try:
+        formatter_opts = sqlparse.formatter.validate_options(formatter_opts)
+    except SQLParseError as e:
+        return _error(f'Invalid options: {e}')
+
+    # Open input, it's read while formatting
     if filename == '-':  # read from stdin
-        wrapper = TextIOWrapper(sys.stdin.buffer, encoding=args.encoding)
-        try:
-            data = wrapper.read()
-        finally:
-            wrapper.detach()
+        data = TextIOWrapper(sys.stdin.buffer, encoding=args.encoding)
     else:
         try:
-            with open(filename, encoding=args.encoding) as f:
-                data = ''.join(f.readlines())
+            data = open(filename, encoding=args.encoding)
         except OSError as e:
             return _error(f'Failed to read {filename}: {e}')
 
-    # Determine output destination
-    close_stream = False
-    if args.inplace:
-        try:
-            stream = open(filename, 'w', encoding=args.encoding)
-            close_stream = True
-        except OSError as e:
-            return _error(f'Failed to open {filename}: {e}')
-    elif args.outfile:
-        try:
-            stream = open(args.outfile, 'w', encoding=args.encoding)
-            close_stream = True
-        except OSError as e:
-            return _error(f'Failed to open {args.outfile}: {e}')
-    else:
-        stream = sys.stdout
-
-    # Format the SQL
-    formatter_opts = vars(args)
     try:
-        formatter_opts = sqlparse.formatter.validate_options(formatter_opts)
-    except SQLParseError as e:
-        return _error(f'Invalid options: {e}')
-
-    s = sqlparse.format(data, **formatter_opts)
-    stream.write(s)
-    stream.flush()
-    if close_stream:
-        stream.close()
+        stack = sqlparse.formatter.build_filter_stack(
+            sqlparse.engine.FilterStack(), formatter_opts)
+        stack.postprocess.append(sqlparse.filters.SerializerUnicode())
+        statements = stack.run(data)
+        if args.inplace or _same_file(filename, args.outfile):
+            # The file is overwritten, so everything has to be read first.
+            statements = [''.join(statements)]
+
+        # Determine output destination
+        close_stream = False
+        if args.inplace:
+            try:
+                stream = open(filename, 'w', encoding=args.encoding)
+                close_stream = True
+            except OSError as e:
+                return _error(f'Failed to open {filename}: {e}')
+        elif args.outfile:
+            try:
+                stream = open(args.outfile, 'w', encoding=args.encoding)
+                close_stream = True
+            except OSError as e:
+                return _error(f'Failed to open {args.outfile}: {e}')
+        else:
+            stream = sys.stdout
+
+        # Format the SQL, one statement at a time
+        for s in statements:
+            stream.write(s)
+        stream.flush()
+        if close_stream:
+            stream.close()
+    finally:
+        if filename == '-':
+            data.detach()
+        else:
+            data.close()
     return 0
 
 
+def _process_file_in_worker(filename, args):
+    """Process a single file in a worker process.
+
+    Returns the result of _process_file() and the errors it reported.
+    """
+    errors = StringIO()
+    with redirect_stderr(errors):
+        result = _process_file(filename, args)
+    return result, errors.getvalue()
+
+
+def _process_files_in_pool(args):
+    """Process all files in a pool of args.jobs worker processes.
+
+    Yields the result for each file in order, errors are reported just as
+    if the files were processed one after another.
+    """
+    worker = partial(_process_file_in_worker, args=args)
+    with ProcessPoolExecutor(args.jobs) as executor:
+        for result, errors in executor.map(worker, args.filename):
+            sys.stderr.write(errors)
+            yield result
+
+
 def main(args=None):
     parser = create_parser()
     args = parser.parse_args(args)
@@ -235,10 +294,17 @@ def main(args=None):
         if not args.inplace:
             return _error('Multiple files require --in-place flag')
 
+    if args.jobs < 1:
+        return _error('--jobs must be at least 1')
+
     # Process all files
+    if args.jobs > 1 and len(args.filename) > 1:
+        results = _process_files_in_pool(args)
+    else:
+        results = (_process_file(filename, args) for filename in args.filename)
+
     exit_code = 0
-    for filename in args.filename:
-        result = _process_file(filename, args)
+    for result in results:
         if result != 0:
             exit_code = result
             # Continue processing remaining files even if one fails
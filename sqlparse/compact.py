@@ -0,0 +1,319 @@
+#
+# Copyright (C) 2009-2020 the sqlparse authors and contributors
+# <see AUTHORS file>
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: https://opensource.org/licenses/BSD-3-Clause
+
+"""A compact, read-only representation of parsed statements.
+
+A :class:`CompactStatement` keeps the text of a statement and its parse
+tree as parallel integer columns instead of an object per token.  Nodes
+are numbered in pre-order, the statement itself being node 0, and for
+each node the columns hold its kind (token type or group class), start
+and end offset within the statement text, and the index of its parent,
+first child and next sibling (-1 if there's none).
+
+:class:`CompactToken` is a lightweight view of a single node, created on
+access, that mirrors the read-only parts of the :mod:`sqlparse.sql` API.
+"""
+
+from array import array
+
+from sqlparse import sql
+from sqlparse import tokens as T
+
+# Node kinds, i.e. token types of tokens and classes of groups, by id.
+# The ids are local to the process.
+_KINDS = []
+_KIND_IDS = {}
+
+# Columns of CompactStatement._nodes.
+_KIND, _START, _END, _PARENT, _FIRST_CHILD, _NEXT_SIBLING = range(6)
+_COLUMNS = 6
+
+
+def _kind_id(kind):
+    try:
+        return _KIND_IDS[kind]
+    except KeyError:
+        kind_id = _KIND_IDS[kind] = len(_KINDS)
+        _KINDS.append(kind)
+        return kind_id
+
+
+class CompactStatement:
+    """A parsed statement stored as columns of integers.
+
+    ``text`` is the statement as string.  Use :meth:`from_statement` to
+    convert a :class:`~sqlparse.sql.Statement`, or
+    :func:`sqlparse.parse_compact` to parse directly into this form.
+    """
+
+    __slots__ = ('_nodes', 'text')
+
+    def __init__(self, text, nodes):
+        self.text = text
+        self._nodes = nodes
+
+    @classmethod
+    def from_statement(cls, stmt):
+        """Builds the compact form of the :class:`~sqlparse.sql.Statement`
+        *stmt*."""
+        kinds, starts, ends = [], [], []
+        parents, first_children, next_siblings = [], [], []
+        values = []
+
+        def add(token, parent, offset):
+            idx = len(kinds)
+            kinds.append(_kind_id(type(token) if token.is_group
+                                  else token.ttype))
+            starts.append(offset)
+            ends.append(offset)
+            parents.append(parent)
+            first_children.append(-1)
+            next_siblings.append(-1)
+            if token.is_group:
+                prev = -1
+                for child in token.tokens:
+                    child_idx = len(kinds)
+                    if prev < 0:
+                        first_children[idx] = child_idx
+                    else:
+                        next_siblings[prev] = child_idx
+                    offset = add(child, idx, offset)
+                    prev = child_idx
+            else:
+                values.append(token.value)
+                offset += len(token.value)
+            ends[idx] = offset
+            return offset
+
+        add(stmt, -1, 0)
+        nodes = array('i', kinds + starts + ends + parents
+                      + first_children + next_siblings)
+        return cls(''.join(values), nodes)
+
+    def __len__(self):
+        """The number of nodes, including the statement itself."""
+        return len(self._nodes) // _COLUMNS
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f'<CompactStatement {self.root._get_repr_value()!r}>'
+
+    def _get(self, column, idx):
+        return self._nodes[column * (len(self._nodes) // _COLUMNS) + idx]
+
+    @property
+    def root(self):
+        """The :class:`CompactToken` of the statement itself."""
+        return CompactToken(self, 0)
+
+    @property
+    def tokens(self):
+        return self.root.tokens
+
+    def flatten(self):
+        return self.root.flatten()
+
+    def get_sublists(self):
+        return self.root.get_sublists()
+
+    def token_first(self, skip_ws=True, skip_cm=False):
+        return self.root.token_first(skip_ws, skip_cm)
+
+    def token_next(self, idx, skip_ws=True, skip_cm=False):
+        return self.root.token_next(idx, skip_ws, skip_cm)
+
+    def token_prev(self, idx, skip_ws=True, skip_cm=False):
+        return self.root.token_prev(idx, skip_ws, skip_cm)
+
+    def get_type(self):
+        """Returns the type of the statement, see
+        :meth:`sqlparse.sql.Statement.get_type`."""
+        root = self.root
+        token = root.token_first(skip_cm=True)
+        if token is None:
+            return 'UNKNOWN'
+
+        elif token.ttype in (T.Keyword.DML, T.Keyword.DDL):
+            return token.normalized
+
+        elif token.ttype == T.Keyword.CTE:
+            tidx = token._child_index()
+            while tidx is not None:
+                tidx, token = root.token_next(tidx, skip_ws=True)
+                if token is not None and token.cls in (
+                        sql.Identifier, sql.IdentifierList):
+                    tidx, token = root.token_next(tidx, skip_ws=True)
+
+                    if token is not None \
+                            and token.ttype == T.Keyword.DML:
+                        return token.normalized
+
+        return 'UNKNOWN'
+
+
+class CompactToken:
+    """A view of a single node of a :class:`CompactStatement`.
+
+    Views are created on access, compare equal if they refer to the same
+    node, and offer the read-only attributes and methods of
+    :class:`~sqlparse.sql.Token` and :class:`~sqlparse.sql.TokenList`.
+    """
+
+    __slots__ = ('idx', 'stmt')
+
+    def __init__(self, stmt, idx):
+        self.stmt = stmt
+        self.idx = idx
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactToken):
+            return NotImplemented
+        return self.stmt is other.stmt and self.idx == other.idx
+
+    def __hash__(self):
+        return hash((id(self.stmt), self.idx))
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        if self.is_group:
+            cls = self.cls.__name__
+        else:
+            cls = str(self.ttype).split('.')[-1]
+        value = self._get_repr_value()
+        q = '"' if value.startswith("'") and value.endswith("'") else "'"
+        return f'<Compact{cls} {q}{value}{q}>'
+
+    def _get_repr_value(self):
+        return sql.Token._get_repr_value(self)
+
+    @property
+    def _kind(self):
+        return _KINDS[self.stmt._get(_KIND, self.idx)]
+
+    @property
+    def ttype(self):
+        """The token type, or ``None`` for groups."""
+        kind = self._kind
+        return None if isinstance(kind, type) else kind
+
+    @property
+    def cls(self):
+        """The :mod:`sqlparse.sql` class the node would be an instance of,
+        e.g. :class:`~sqlparse.sql.Identifier`."""
+        kind = self._kind
+        return kind if isinstance(kind, type) else sql.Token
+
+    @property
+    def is_group(self):
+        return isinstance(self._kind, type)
+
+    @property
+    def is_keyword(self):
+        return self.ttype in T.Keyword
+
+    @property
+    def is_whitespace(self):
+        return self.ttype in T.Whitespace
+
+    @property
+    def is_newline(self):
+        return self.ttype in T.Newline
+
+    @property
+    def span(self):
+        """The ``(start, end)`` offsets within the statement text."""
+        return (self.stmt._get(_START, self.idx),
+                self.stmt._get(_END, self.idx))
+
+    @property
+    def value(self):
+        start, end = self.span
+        return self.stmt.text[start:end]
+
+    @property
+    def normalized(self):
+        value = self.value
+        return value.upper() if self.is_keyword else value
+
+    @property
+    def parent(self):
+        idx = self.stmt._get(_PARENT, self.idx)
+        return CompactToken(self.stmt, idx) if idx >= 0 else None
+
+    def _children(self):
+        stmt = self.stmt
+        idx = stmt._get(_FIRST_CHILD, self.idx)
+        while idx >= 0:
+            yield idx
+            idx = stmt._get(_NEXT_SIBLING, idx)
+
+    def _child_index(self):
+        """Index of this node in the tokens of its parent."""
+        parent = self.parent
+        for i, idx in enumerate(parent._children()):
+            if idx == self.idx:
+                return i
+
+    @property
+    def tokens(self):
+        """The child tokens, an empty list for tokens that aren't groups."""
+        return [CompactToken(self.stmt, idx) for idx in self._children()]
+
+    def flatten(self):
+        """Generator yielding ungrouped tokens."""
+        if not self.is_group:
+            yield self
+            return
+        # Pre-order numbering makes the descendants of a node the nodes
+        # following it, up to the first one with a parent before it.
+        stmt = self.stmt
+        idx = self.idx + 1
+        while idx < len(stmt) and stmt._get(_PARENT, idx) >= self.idx:
+            if not isinstance(_KINDS[stmt._get(_KIND, idx)], type):
+                yield CompactToken(stmt, idx)
+            idx += 1
+
+    def get_sublists(self):
+        for idx in self._children():
+            token = CompactToken(self.stmt, idx)
+            if token.is_group:
+                yield token
+
+    def _token_matching(self, skip_ws, skip_cm, start, reverse=False):
+        tokens = self.tokens
+        indexes = range(start - 2, -1, -1) if reverse \
+            else range(start, len(tokens))
+        for idx in indexes:
+            token = tokens[idx]
+            if not ((skip_ws and token.is_whitespace)
+                    or (skip_cm and (token.ttype in T.Comment
+                                     or token.cls is sql.Comment))):
+                return idx, token
+        return None, None
+
+    def token_first(self, skip_ws=True, skip_cm=False):
+        """Returns the first child token, see
+        :meth:`sqlparse.sql.TokenList.token_first`."""
+        return self._token_matching(skip_ws, skip_cm, 0)[1]
+
+    def token_next(self, idx, skip_ws=True, skip_cm=False):
+        """Returns the next child token relative to *idx* as ``(index,
+        token)``, see :meth:`sqlparse.sql.TokenList.token_next`."""
+        if idx is None:
+            return None, None
+        return self._token_matching(skip_ws, skip_cm, idx + 1)
+
+    def token_prev(self, idx, skip_ws=True, skip_cm=False):
+        """Returns the previous child token relative to *idx* as ``(index,
+        token)``, see :meth:`sqlparse.sql.TokenList.token_prev`."""
+        if idx is None:
+            return None, None
+        return self._token_matching(skip_ws, skip_cm, idx + 1, reverse=True)
@@ -7,6 +7,8 @@
 
 """filter"""
 
+from itertools import starmap
+
 from sqlparse import lexer
 from sqlparse.engine import grouping
 from sqlparse.engine.statement_splitter import StatementSplitter
@@ -14,31 +16,80 @@ from sqlparse.exceptions import SQLParseError
 from sqlparse.filters import StripTrailingSemicolonFilter
 
 
+def _fuse(funcs):
+    """Returns a function applying the per-token functions *funcs* in
+    order."""
+    if len(funcs) == 1:
+        return funcs[0]
+
+    def fused(ttype, value):
+        for func in funcs:
+            ttype, value = func(ttype, value)
+        return ttype, value
+    return fused
+
+
 class FilterStack:
+    """Runs the lexer, splits statements and applies filters.
+
+    ``preprocess`` filters take and return a stream of ``(ttype, value)``
+    pairs.  A filter that only ever looks at one token at a time can
+    instead offer a ``process_token(ttype, value)`` method returning the
+    new pair; consecutive filters of that kind are fused into a single
+    function called once per token.
+    """
+
     def __init__(self, strip_semicolon=False):
         self.preprocess = []
         self.stmtprocess = []
         self.postprocess = []
-        self._grouping = False
+        self._grouping = ()
         if strip_semicolon:
             self.stmtprocess.append(StripTrailingSemicolonFilter())
 
-    def enable_grouping(self):
-        self._grouping = True
+    def enable_grouping(self, level='full'):
+        """Groups statements before the ``stmtprocess`` filters run.
+
+        *level* selects the grouping passes, see
+        :func:`sqlparse.engine.grouping.passes`.  Calling this again adds
+        the passes of another level.
+        """
+        self._grouping = grouping.passes(self._grouping, level)
+
+    def reset(self):
+        """Resets filters that keep state from one statement to the next,
+        i.e. those that have a ``reset()`` method, before the stack is
+        run again."""
+        for filter_ in self.preprocess + self.stmtprocess + self.postprocess:
+            reset = getattr(filter_, 'reset', None)
+            if reset is not None:
+                reset()
+
+    def _preprocess(self, stream):
+        funcs = []
+        for filter_ in self.preprocess:
+            process_token = getattr(filter_, 'process_token', None)
+            if process_token is not None:
+                funcs.append(process_token)
+                continue
+            if funcs:
+                stream = starmap(_fuse(funcs), stream)
+                funcs = []
+            stream = filter_.process(stream)
+        if funcs:
+            stream = starmap(_fuse(funcs), stream)
+        return stream
 
     def run(self, sql, encoding=None):
         try:
-            stream = lexer.tokenize(sql, encoding)
-            # Process token stream
-            for filter_ in self.preprocess:
-                stream = filter_.process(stream)
+            stream = self._preprocess(lexer.tokenize(sql, encoding))
 
             stream = StatementSplitter().process(stream)
 
             # Output: Stream processed Statements
             for stmt in stream:
                 if self._grouping:
-                    stmt = grouping.group(stmt)
+                    stmt = grouping.group(stmt, self._grouping)
 
                 for filter_ in self.stmtprocess:
                     filter_.process(stmt)
@@ -439,38 +439,118 @@ def group_values(tlist):
         tlist.group_tokens(sql.Values, start_idx, end_idx, extend=True)
 
 
-def group(stmt):
-    for func in [
-        group_comments,
-
-        # _group_matching
-        group_brackets,
-        group_parenthesis,
-        group_case,
-        group_if,
-        group_for,
-        group_begin,
-
-        group_over,
-        group_functions,
-        group_where,
-        group_period,
-        group_arrays,
-        group_identifier,
-        group_order,
-        group_typecasts,
-        group_tzcasts,
-        group_typed_literal,
-        group_operator,
-        group_comparison,
-        group_as,
-        group_aliased,
-        group_assignment,
-
-        align_comments,
-        group_identifier_list,
-        group_values,
-    ]:
+# All grouping passes in the order they run.  Later passes rely on the
+# groups built by earlier ones.
+GROUPING_PASSES = (
+    group_comments,
+
+    # _group_matching
+    group_brackets,
+    group_parenthesis,
+    group_case,
+    group_if,
+    group_for,
+    group_begin,
+
+    group_over,
+    group_functions,
+    group_where,
+    group_period,
+    group_arrays,
+    group_identifier,
+    group_order,
+    group_typecasts,
+    group_tzcasts,
+    group_typed_literal,
+    group_operator,
+    group_comparison,
+    group_as,
+    group_aliased,
+    group_assignment,
+
+    align_comments,
+    group_identifier_list,
+    group_values,
+)
+
+_MATCHING = (group_brackets, group_parenthesis, group_case, group_if,
+             group_for, group_begin)
+_NAMES = _MATCHING + (group_over, group_functions, group_period,
+                      group_arrays, group_identifier)
+_OPERANDS = _NAMES + (group_typecasts, group_tzcasts, group_typed_literal)
+
+# The passes each pass depends on.
+_REQUIRES = {
+    group_comments: (),
+    group_brackets: (),
+    group_parenthesis: (),
+    group_case: (),
+    group_if: (),
+    group_for: (),
+    group_begin: (),
+    group_over: _MATCHING,
+    group_functions: _MATCHING + (group_over,),
+    group_where: _MATCHING,
+    group_period: _MATCHING + (group_functions,),
+    group_arrays: _MATCHING + (group_functions, group_period),
+    group_identifier: _MATCHING + (group_period, group_arrays),
+    group_order: _NAMES,
+    group_typecasts: _NAMES,
+    group_tzcasts: _NAMES,
+    group_typed_literal: _NAMES,
+    group_operator: _OPERANDS,
+    group_comparison: _OPERANDS + (group_operator,),
+    group_as: _OPERANDS + (group_operator, group_comparison),
+    group_aliased: _OPERANDS + (group_operator, group_comparison, group_as),
+    group_assignment: _MATCHING,
+    align_comments: (group_comments,),
+    group_identifier_list: GROUPING_PASSES[:GROUPING_PASSES.index(
+        group_identifier_list)],
+    group_values: _MATCHING,
+}
+
+# Named subsets of the grouping passes, see passes().
+GROUPING_LEVELS = {
+    'comments': (group_comments, align_comments),
+    'brackets': (group_brackets, group_parenthesis),
+    'operators': (group_comments, group_where, group_operator,
+                  group_comparison, group_aliased, group_assignment,
+                  align_comments),
+    'identifiers': (group_where, group_order, group_identifier_list),
+    'full': GROUPING_PASSES,
+}
+
+
+def passes(*levels):
+    """Returns the grouping passes needed for *levels*, in the order they
+    have to run.
+
+    A level is either the name of a level in ``GROUPING_LEVELS`` or an
+    iterable of grouping passes.  The passes these depend on are included.
+    """
+    needed = set()
+    for level in levels:
+        if isinstance(level, str):
+            try:
+                level = GROUPING_LEVELS[level]
+            except KeyError:
+                raise SQLParseError(
+                    f'Invalid grouping level: {level!r}') from None
+        for func in level:
+            if func not in _REQUIRES:
+                raise SQLParseError(f'Not a grouping pass: {func!r}')
+            needed.add(func)
+            needed.update(_REQUIRES[func])
+    return tuple(func for func in GROUPING_PASSES if func in needed)
+
+
+def group(stmt, passes=GROUPING_PASSES):
+    """Groups the tokens of *stmt*.
+
+    By default all grouping passes run, use :func:`passes` to select the
+    ones needed.
+    """
+    for func in passes:
         func(stmt)
     return stmt
 
@@ -5,8 +5,21 @@
 # This module is part of python-sqlparse and is released under
 # the BSD License: https://opensource.org/licenses/BSD-3-Clause
 
-from sqlparse import sql
+import os
+import re
+from functools import partial
+from itertools import pairwise
+
+from sqlparse import keywords, lexer, parallel, sql
 from sqlparse import tokens as T
+from sqlparse.engine import grouping
+
+# Minimum number of characters split by a single worker process, see
+# split_offsets_parallel().
+PARALLEL_CHUNK_SIZE = 1 << 20
+
+# A semicolon ending a line, where a text is cut into chunks.
+_CHUNK_CUT = re.compile(r';[ \t]*\r?\n')
 
 
 class StatementSplitter:
@@ -148,9 +161,36 @@ class StatementSplitter:
         # Handle closing keywords
         return self._handle_closing_keyword(unified)
 
+    def _process_token(self, ttype, value):
+        """Update the splitter state for the next token of a statement"""
+        # Change current split level (increase, decrease or remain equal)
+        self.level += self._change_splitlevel(ttype, value)
+
+        # Check if we get the end of a statement
+        # Issue762: Allow GO (or "GO 2") as statement splitter.
+        # When implementing a language toggle, it's not only to add
+        # keywords it's also to change some rules, like this splitting
+        # rule.
+        # Issue809: Ignore semicolons inside BEGIN...END blocks, but handle
+        # standalone BEGIN; as a transaction statement
+        if ttype is T.Punctuation and value == ';':
+            self._seen_begin = False
+            # Split on semicolon if not inside a BEGIN...END block
+            if self.level <= 0 and 'BEGIN' not in self._block_stack:
+                self.consume_ws = True
+        elif ttype is T.Keyword and value.split()[0] == 'GO':
+            self.consume_ws = True
+        elif (ttype not in (T.Whitespace, T.Newline, T.Comment.Single,
+                            T.Comment.Multiline)
+              and not (ttype is T.Keyword and value.upper() == 'BEGIN')):
+            # Reset _seen_begin if we see a non-whitespace, non-comment
+            # token but not for BEGIN itself (which just set the flag)
+            self._seen_begin = False
+
     def process(self, stream):
         """Process the stream"""
         EOS_TTYPE = T.Whitespace, T.Comment.Single
+        pos = 0
 
         # Run over all stream tokens
         for ttype, value in stream:
@@ -164,33 +204,167 @@ class StatementSplitter:
                 # Reset filter and prepare to process next statement
                 self._reset()
 
-            # Change current split level (increase, decrease or remain equal)
-            self.level += self._change_splitlevel(ttype, value)
+            self._process_token(ttype, value)
 
             # Append the token to the current statement
-            self.tokens.append(sql.Token(ttype, value))
-
-            # Check if we get the end of a statement
-            # Issue762: Allow GO (or "GO 2") as statement splitter.
-            # When implementing a language toggle, it's not only to add
-            # keywords it's also to change some rules, like this splitting
-            # rule.
-            # Issue809: Ignore semicolons inside BEGIN...END blocks, but handle
-            # standalone BEGIN; as a transaction statement
-            if ttype is T.Punctuation and value == ';':
-                self._seen_begin = False
-                # Split on semicolon if not inside a BEGIN...END block
-                if self.level <= 0 and 'BEGIN' not in self._block_stack:
-                    self.consume_ws = True
-            elif ttype is T.Keyword and value.split()[0] == 'GO':
-                self.consume_ws = True
-            elif (ttype not in (T.Whitespace, T.Newline, T.Comment.Single,
-                                T.Comment.Multiline)
-                  and not (ttype is T.Keyword and value.upper() == 'BEGIN')):
-                # Reset _seen_begin if we see a non-whitespace, non-comment
-                # token but not for BEGIN itself (which just set the flag)
-                self._seen_begin = False
+            self.tokens.append(sql.Token._make(ttype, value, pos))
+            pos += len(value)
 
         # Yield pending statement (if any)
         if self.tokens and not all(t.is_whitespace for t in self.tokens):
             yield sql.Statement(self.tokens)
+
+    def process_offsets(self, stream, strip_semicolon=False, with_type=False):
+        """Process the stream, yielding ``(start, end)`` offsets of each
+        statement instead of :class:`~sqlparse.sql.Statement` instances.
+
+        The statements are the ones :meth:`process` yields, but without
+        leading and trailing whitespace. If *strip_semicolon* is True,
+        trailing semicolons are left out too. If *with_type* is True, the
+        statement type as returned by
+        :meth:`~sqlparse.sql.Statement.get_type` is added to each tuple.
+        """
+        EOS_TTYPE = T.Whitespace, T.Comment.Single
+        pos = 0
+        # Offset and value of the first non-whitespace token, and end
+        # offset and value of the last one to keep.
+        first = last = None
+        # The first token that's no comment either, and -- for statements
+        # starting with a CTE -- all tokens from there on.
+        head = cte = None
+
+        def span():
+            first_pos, value = first
+            start = first_pos + len(value) - len(value.lstrip())
+            end = start
+            if last is not None:
+                last_end, value = last
+                end = max(start, last_end - len(value) + len(value.rstrip()))
+            if not with_type:
+                return start, end
+            if head is None:
+                stmt_type = 'UNKNOWN'
+            elif cte is None:
+                stmt_type = head
+            else:
+                # get_type() only looks at the identifiers of the CTE.
+                stmt = grouping.group(sql.Statement(
+                    [sql.Token(ttype, value) for ttype, value in cte]),
+                    grouping.passes('identifiers'))
+                stmt_type = stmt.get_type()
+            return start, end, stmt_type
+
+        for ttype, value in stream:
+            if self.consume_ws and ttype not in EOS_TTYPE:
+                yield span()
+                self._reset()
+                first = last = head = cte = None
+
+            self._process_token(ttype, value)
+            end = pos + len(value)
+
+            if ttype not in T.Whitespace:
+                if first is None:
+                    first = pos, value
+                if not (strip_semicolon and value == ';'):
+                    last = end, value
+                if with_type:
+                    if cte is not None:
+                        cte.append((ttype, value))
+                    elif head is None and ttype not in T.Comment:
+                        if ttype is T.Keyword.DML or ttype is T.Keyword.DDL:
+                            head = value.upper()
+                        else:
+                            head = 'UNKNOWN'
+                            if ttype is T.Keyword.CTE:
+                                cte = [(ttype, value)]
+            elif cte is not None:
+                cte.append((ttype, value))
+            pos = end
+
+        # Whether the input ended between two statements, i.e. the last
+        # statement was complete and no other had started yet.
+        self.at_statement_start = first is None
+        if first is not None:
+            yield span()
+
+
+def _split_chunk(text, strip_semicolon=False, with_type=False):
+    """Returns the offsets of the statements in *text* and whether it ends
+    on a statement boundary.
+
+    A chunk ends on a boundary if its last statement is complete and no
+    token in it is missing a closing delimiter that might follow later.
+    """
+    lex = lexer.Lexer.get_default_instance()
+    delimited_spans = keywords.find_delimited_spans(text)
+    span_openers = delimited_spans.openers
+    unclosed = False
+
+    def stream():
+        nonlocal unclosed
+        pos = 0
+        for token in lex._lex(text, 0, delimited_spans):
+            ttype, value = token
+            if ((ttype is T.Error or ttype is T.Punctuation
+                 or pos in span_openers)
+                    and lexer._is_unclosed(text, pos, ttype, value,
+                                           delimited_spans)):
+                unclosed = True
+            pos += len(value)
+            yield token
+
+    splitter = StatementSplitter()
+    offsets = list(splitter.process_offsets(
+        stream(), strip_semicolon, with_type))
+    return offsets, splitter.at_statement_start and not unclosed
+
+
+def split_offsets_parallel(text, processes=None, strip_semicolon=False,
+                           with_type=False):
+    """Splits *text* like :meth:`StatementSplitter.process_offsets` does,
+    but in a pool of *processes* worker processes.
+
+    The text is cut into chunks at semicolons ending a line and each chunk
+    is split on its own.  A cut may turn out to be within a statement,
+    e.g. in a string literal or a ``BEGIN ... END`` block.  Such a chunk
+    doesn't end on a statement boundary and is split again together with
+    the following chunks, so the result is always the same as splitting
+    the text as a whole.
+
+    Returns a list of offset tuples.
+    """
+    workers = processes or os.cpu_count() or 1
+    size = max(PARALLEL_CHUNK_SIZE, len(text) // (workers * 4) + 1)
+    bounds = [0]
+    while len(text) - bounds[-1] > size:
+        m = _CHUNK_CUT.search(text, bounds[-1] + size)
+        if m is None:
+            break
+        bounds.append(m.end())
+    bounds.append(len(text))
+
+    split = partial(_split_chunk, strip_semicolon=strip_semicolon,
+                    with_type=with_type)
+    chunks = (text[start:end] for start, end in pairwise(bounds))
+    if workers == 1 or len(bounds) == 2:
+        results = [split(chunk) for chunk in chunks]
+    else:
+        with parallel.process_pool(workers) as executor:
+            results = list(executor.map(split, chunks))
+
+    offsets = []
+    count = len(results)
+    i = 0
+    while i < count:
+        start = bounds[i]
+        chunk_offsets, clean = results[i]
+        j = i
+        while not clean and j < count - 1:
+            # Join the next chunks, twice as many each time.
+            j = min(count - 1, j + j - i + 1)
+            chunk_offsets, clean = split(text[start:bounds[j + 1]])
+        offsets.extend((first + start, last + start, *rest)
+                       for first, last, *rest in chunk_offsets)
+        i = j + 1
+    return offsets
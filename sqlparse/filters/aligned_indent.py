@@ -24,10 +24,14 @@ class AlignedIndentFilter:
 
     def __init__(self, char=' ', n='\n'):
         self.n = n
-        self.offset = 0
-        self.indent = 0
         self.char = char
         self._max_kwd_len = len('select')
+        self.reset()
+
+    def reset(self):
+        """Restores the initial indentation."""
+        self.offset = 0
+        self.indent = 0
 
     def nl(self, offset=1):
         # offset = 1 represent a single space after SELECT
@@ -42,6 +46,7 @@ class AlignedIndentFilter:
         if len(tlist.tokens) > 0 and tlist.tokens[0].is_whitespace \
                 and self.indent == 0:
             tlist.tokens.pop(0)
+            tlist._invalidate_value()
 
         # process the main query body
         self._process(sql.TokenList(tlist.tokens))
@@ -9,51 +9,161 @@ import re
 
 from sqlparse import sql
 from sqlparse import tokens as T
-from sqlparse.utils import split_unquoted_newlines
+from sqlparse.engine import grouping
+from sqlparse.utils import imt, split_unquoted_newlines
 
 
 class StripCommentsFilter:
+    """Removes comments, except for SQL hints.
+
+    By default the filter expects grouped statements.  With *grouped* set
+    to False it works on the plain tokens of statements that weren't
+    grouped, so that formatting can skip grouping if nothing else needs
+    it.  The result is the same as for grouped statements.
+    """
+
+    def __init__(self, grouped=True):
+        self.grouped = grouped
 
     @staticmethod
-    def _process(tlist):
-        def get_next_comment(idx=-1):
-            # TODO(andi) Comment types should be unified, see related issue38
-            return tlist.token_next_by(i=sql.Comment, t=T.Comment, idx=idx)
+    def _process_tokens(stmt):
+        """Strips comments from the plain tokens of *stmt*.
+
+        Returns False, leaving *stmt* untouched, if that can't be done
+        without grouping.
+        """
+        def strip(tokens):
+            # The rules of _process, a comment is replaced unless it's the
+            # first token or follows an opening parenthesis.
+            stripped = []
+            for token in tokens:
+                if isinstance(token, list):
+                    run = strip(token)
+                    if run and run[0].ttype in sql_hints:
+                        stripped.extend(run)
+                        continue
+                    text = ''.join(tk.value for tk in token)
+                elif token.ttype not in T.Comment \
+                        or token.ttype in sql_hints:
+                    stripped.append(token)
+                    continue
+                else:
+                    text = token.value
+                prev_ = stripped[-1] if stripped else None
+                if prev_ is None or prev_.match(T.Punctuation, '('):
+                    continue
+                # Keep line breaks, see issue484.
+                m = re.search(r'([\r\n]+) *$', text)
+                if m is not None:
+                    insert = sql.Token(T.Whitespace.Newline, m.group(1))
+                else:
+                    insert = sql.Token(T.Whitespace, ' ')
+                insert.parent = stmt
+                stripped.append(insert)
+            return stripped
+
+        sql_hints = (T.Comment.Multiline.Hint, T.Comment.Single.Hint)
+        old_tokens = stmt.tokens
+
+        def next_token(idx):
+            while idx < len(old_tokens) and old_tokens[idx].is_whitespace:
+                idx += 1
+            if idx < len(old_tokens):
+                return idx, old_tokens[idx]
+            return None, None
+
+        def starts_group(idx):
+            # Whether the comments before idx become the first token of an
+            # identifier or assignment, like in "-- c\n AS x", see group_as,
+            # group_typecasts, group_tzcasts and group_assignment.
+            midx, match = next_token(idx)
+            if match is None:
+                return False
+            next_ = next_token(midx + 1)[1]
+            if next_ is None:
+                return False
+            if match.match(T.Keyword, 'AS'):
+                return not imt(next_, t=(T.DML, T.DDL, T.CTE))
+            if match.match(T.Punctuation, '::'):
+                return True
+            if match.ttype == T.Keyword.TZCast:
+                return next_.match(T.Keyword, 'AS') \
+                    or next_.match(*sql.TypedLiteral.M_CLOSE)
+            if match.match(T.Assignment, ':='):
+                return next_.ttype not in (T.Keyword,)
+            return False
+
+        # Runs of comments and line breaks are replaced as a whole, like
+        # the Comment groups built by grouping.group_comments.
+        tokens = []
+        after_run = False
+        idx = 0
+        while idx < len(old_tokens):
+            token = old_tokens[idx]
+            end = idx + 1
+            if token.ttype in T.Comment:
+                while end < len(old_tokens) and (
+                        old_tokens[end].ttype in T.Comment
+                        or old_tokens[end].is_newline):
+                    end += 1
+                if end == len(old_tokens):
+                    # Trailing comments aren't grouped.
+                    tokens.extend(old_tokens[idx:])
+                    break
+                if after_run:
+                    # Runs only separated by whitespace are joined if the
+                    # first one isn't aligned to the group before it.
+                    return False
+                if starts_group(end):
+                    # Stripped like the first token of a group.
+                    tokens.extend(strip([old_tokens[idx:end]]))
+                    idx = end
+                    continue
+                tokens.append(old_tokens[idx:end])
+                after_run = True
+            else:
+                tokens.append(token)
+                after_run = after_run and token.is_whitespace
+            idx = end
+        stmt.tokens = strip(tokens)
+        return True
 
+    @staticmethod
+    def _process(tlist, texts=None):
         def _get_insert_token(token):
             """Returns either a whitespace or the line breaks from token."""
             # See issue484 why line breaks should be preserved.
             # Note: The actual value for a line break is replaced by \n
             # in SerializerUnicode which will be executed in the
             # postprocessing state.
-            m = re.search(r'([\r\n]+) *$', token.value)
+            text = texts.get(token, token.value) if texts else token.value
+            m = re.search(r'([\r\n]+) *$', text)
             if m is not None:
                 return sql.Token(T.Whitespace.Newline, m.groups()[0])
             else:
                 return sql.Token(T.Whitespace, ' ')
 
         sql_hints = (T.Comment.Multiline.Hint, T.Comment.Single.Hint)
-        tidx, token = get_next_comment()
-        while token:
+        # The children are copied to a new list in a single pass, inserting
+        # and removing tokens in place is quadratic for many comments.
+        old_tokens = tlist.tokens
+        tokens = []
+        for idx, token in enumerate(old_tokens):
+            # TODO(andi) Comment types should be unified, see related issue38
+            if token.ttype not in T.Comment \
+                    and not isinstance(token, sql.Comment):
+                tokens.append(token)
+                continue
+
             # skipping token remove if token is a SQL-Hint. issue262
-            is_sql_hint = False
-            if token.ttype in sql_hints:
-                is_sql_hint = True
-            elif isinstance(token, sql.Comment):
-                comment_tokens = token.tokens
-                if len(comment_tokens) > 0:
-                    if comment_tokens[0].ttype in sql_hints:
-                        is_sql_hint = True
-
-            if is_sql_hint:
-                # using current index as start index to search next token for
-                # preventing infinite loop in cases when token type is a
-                # "SQL-Hint" and has to be skipped
-                tidx, token = get_next_comment(idx=tidx)
+            if token.ttype in sql_hints or (
+                    isinstance(token, sql.Comment) and token.tokens
+                    and token.tokens[0].ttype in sql_hints):
+                tokens.append(token)
                 continue
 
-            pidx, prev_ = tlist.token_prev(tidx, skip_ws=False)
-            nidx, next_ = tlist.token_next(tidx, skip_ws=False)
+            prev_ = tokens[-1] if tokens else None
+            next_ = old_tokens[idx + 1] if idx + 1 < len(old_tokens) else None
             # Replace by whitespace if prev and next exist and if they're not
             # whitespaces. This doesn't apply if prev or next is a parenthesis.
             if (
@@ -64,20 +174,28 @@ class StripCommentsFilter:
                 # Insert a whitespace to ensure the following SQL produces
                 # a valid SQL (see #425).
                 if prev_ is not None and not prev_.match(T.Punctuation, '('):
-                    tlist.tokens.insert(tidx, _get_insert_token(token))
-                tlist.tokens.remove(token)
-                tidx -= 1
+                    tokens.append(_get_insert_token(token))
             else:
-                tlist.tokens[tidx] = _get_insert_token(token)
+                tokens.append(_get_insert_token(token))
+        tlist.tokens = tokens
 
-            # using current index as start index to search next token for
-            # preventing infinite loop in cases when token type is a
-            # "SQL-Hint" and has to be skipped
-            tidx, token = get_next_comment(idx=tidx)
+    def _process_groups(self, tlist):
+        # Comments are replaced according to their text before the comments
+        # within them are stripped.
+        texts = {}
+        for sgroup in tlist.get_sublists():
+            if isinstance(sgroup, sql.Comment):
+                texts[sgroup] = str(sgroup)
+            self._process_groups(sgroup)
+        StripCommentsFilter._process(tlist, texts)
 
     def process(self, stmt):
-        [self.process(sgroup) for sgroup in stmt.get_sublists()]
-        StripCommentsFilter._process(stmt)
+        if not self.grouped:
+            if self._process_tokens(stmt):
+                return stmt
+            # Fall back to the grouped statement.
+            grouping.group(stmt)
+        self._process_groups(stmt)
         return stmt
 
 
@@ -98,17 +216,21 @@ class StripWhitespaceFilter:
             is_first_char = False
 
     def _stripws_identifierlist(self, tlist):
-        # Removes newlines before commas, see issue140
-        last_nl = None
-        for token in list(tlist.tokens):
-            if last_nl and token.ttype is T.Punctuation and token.value == ',':
-                tlist.tokens.remove(last_nl)
-            last_nl = token if token.is_whitespace else None
+        # Removes whitespace, including newlines, before commas, see
+        # issue140.  Whitespace may come as a single token or as a sequence
+        # of them, depending on how the lexer tokenized it.
+        tokens = []
+        for token in tlist.tokens:
+            if token.ttype is T.Punctuation and token.value == ',':
+                while tokens and tokens[-1].is_whitespace:
+                    tokens.pop()
+            tokens.append(token)
 
             # next_ = tlist.token_next(token, skip_ws=False)
             # if (next_ and not next_.is_whitespace and
             #             token.ttype is T.Punctuation and token.value == ','):
             #     tlist.insert_after(token, sql.Token(T.Whitespace, ' '))
+        tlist.tokens = tokens
         return self._stripws_default(tlist)
 
     def _stripws_parenthesis(self, tlist):
@@ -120,13 +242,16 @@ class StripWhitespaceFilter:
             # save to remove the last whitespace
             while tlist.tokens[-2].tokens[-1].is_whitespace:
                 tlist.tokens[-2].tokens.pop(-1)
+            tlist.tokens[-2]._invalidate_value()
+        tlist._invalidate_value()
         self._stripws_default(tlist)
 
     def process(self, stmt, depth=0):
         [self.process(sgroup, depth + 1) for sgroup in stmt.get_sublists()]
         self._stripws(stmt)
-        if depth == 0 and stmt.tokens and stmt.tokens[-1].is_whitespace:
+        while depth == 0 and stmt.tokens and stmt.tokens[-1].is_whitespace:
             stmt.tokens.pop(-1)
+            stmt._invalidate_value()
         return stmt
 
 
@@ -161,6 +286,7 @@ class StripTrailingSemicolonFilter:
         while stmt.tokens and (stmt.tokens[-1].is_whitespace
                                or stmt.tokens[-1].value == ';'):
             stmt.tokens.pop()
+            stmt._invalidate_value()
         return stmt
 
 
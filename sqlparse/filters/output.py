@@ -14,11 +14,31 @@ class OutputFilter:
 
     def __init__(self, varname='sql'):
         self.varname = self.varname_prefix + varname
+        self.reset()
+
+    def reset(self):
+        """Restarts numbering the variables."""
         self.count = 0
 
     def _process(self, stream, varname, has_nl):
         raise NotImplementedError
 
+    @staticmethod
+    def _leaves(stmt):
+        """Returns the leaves of *stmt*, without whitespace before breaks.
+
+        Line breaks inserted into groups (e.g. by reindenting) only show up
+        in the leaves, and may follow whitespace of an enclosing group.
+        """
+        leaves = []
+        for token in stmt.flatten():
+            if token.is_whitespace and '\n' in token.value:
+                while (leaves and leaves[-1].is_whitespace
+                       and '\n' not in leaves[-1].value):
+                    leaves.pop()
+            leaves.append(token)
+        return leaves
+
     def process(self, stmt):
         self.count += 1
         if self.count > 1:
@@ -27,7 +47,7 @@ class OutputFilter:
             varname = self.varname
 
         has_nl = len(str(stmt).strip().splitlines()) > 1
-        stmt.tokens = self._process(stmt.tokens, varname, has_nl)
+        stmt.tokens = self._process(self._leaves(stmt), varname, has_nl)
         return stmt
 
 
@@ -17,12 +17,17 @@ class ReindentFilter:
         self.n = n
         self.width = width
         self.char = char
-        self.indent = 1 if indent_after_first else 0
-        self.offset = 0
+        self.indent_after_first = indent_after_first
         self.wrap_after = wrap_after
         self.comma_first = comma_first
         self.indent_columns = indent_columns
         self.compact = compact
+        self.reset()
+
+    def reset(self):
+        """Forgets the statements processed so far."""
+        self.indent = 1 if self.indent_after_first else 0
+        self.offset = 0
         self._curr_stmt = None
         self._last_stmt = None
         self._last_func = None
@@ -107,15 +112,26 @@ class ReindentFilter:
 
         return tidx, token
 
+    @staticmethod
+    def _strip_ws_before(tlist, tidx):
+        """Removes the whitespace right before *tidx*, returns its new index.
+
+        Whitespace may come as a single token or as a sequence of them,
+        depending on how the lexer tokenized it.
+        """
+        start = tidx
+        while start > 0 and tlist.tokens[start - 1].is_whitespace:
+            start -= 1
+        del tlist.tokens[start:tidx]
+        tlist._invalidate_value()
+        return start
+
     def _split_kwds(self, tlist):
         tidx, token = self._next_token(tlist)
         while token:
             pidx, prev_ = tlist.token_prev(tidx, skip_ws=False)
             uprev = str(prev_)
-
-            if prev_ and prev_.is_whitespace:
-                del tlist.tokens[pidx]
-                tidx -= 1
+            tidx = self._strip_ws_before(tlist, tidx)
 
             if not (uprev.endswith('\n') or uprev.endswith('\r')):
                 tlist.insert_before(tidx, self.nl())
@@ -128,9 +144,7 @@ class ReindentFilter:
         tidx, token = tlist.token_next_by(t=ttypes)
         while token:
             pidx, prev_ = tlist.token_prev(tidx, skip_ws=False)
-            if prev_ and prev_.is_whitespace:
-                del tlist.tokens[pidx]
-                tidx -= 1
+            tidx = self._strip_ws_before(tlist, tidx)
             # only break if it's not the first token
             if prev_:
                 tlist.insert_before(tidx, self.nl())
@@ -159,7 +173,7 @@ class ReindentFilter:
             return
 
         with indent(self, 1 if is_dml_dll else 0):
-            tlist.tokens.insert(0, self.nl()) if is_dml_dll else None
+            tlist.insert_before(0, self.nl()) if is_dml_dll else None
             with offset(self, self._get_offset(first) + 1):
                 self._process_default(tlist, not is_dml_dll)
 
@@ -282,7 +296,7 @@ class ReindentFilter:
 
         if self._last_stmt is not None:
             nl = '\n' if str(self._last_stmt).endswith('\n') else '\n\n'
-            stmt.tokens.insert(0, sql.Token(T.Whitespace, nl))
+            stmt.insert_before(0, sql.Token(T.Whitespace, nl))
 
         self._last_stmt = stmt
         return stmt
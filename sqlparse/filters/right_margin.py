@@ -5,45 +5,105 @@
 # This module is part of python-sqlparse and is released under
 # the BSD License: https://opensource.org/licenses/BSD-3-Clause
 
-import re
-
 from sqlparse import sql
 from sqlparse import tokens as T
 
 
-# FIXME: Doesn't work
 class RightMarginFilter:
+    """Wraps lines that are longer than *width* characters.
+
+    A line break is inserted before each token that would cross the
+    margin, and the new line is indented like the one it breaks.  Groups
+    of the types in ``keep_together`` aren't broken up as long as they
+    fit on a line.  Lines are never broken between a function name and
+    its parenthesis, around ``.`` and ``::`` or right after ``(``; lines
+    that can't be broken otherwise, e.g. a long string literal, are left
+    as they are.
+    """
+
     keep_together = (
-        # sql.TypeCast, sql.Identifier, sql.Alias,
+        sql.Identifier, sql.Function, sql.Comparison, sql.TypedLiteral,
     )
 
     def __init__(self, width=79):
         self.width = width
-        self.line = ''
-
-    def _process(self, group, stream):
-        for token in stream:
-            if token.is_whitespace and '\n' in token.value:
-                if token.value.endswith('\n'):
-                    self.line = ''
-                else:
-                    self.line = token.value.splitlines()[-1]
-            elif token.is_group and type(token) not in self.keep_together:
-                token.tokens = self._process(token, token.tokens)
+        self.reset()
+
+    def reset(self):
+        """Starts over at the beginning of a line."""
+        # Length and indentation of the current line, which continues from
+        # one statement to the next.
+        self.column = 0
+        self.indent = ''
+        self._at_line_start = True
+        # The last token that isn't whitespace.
+        self._prev = None
+
+    def _keep(self, token, value):
+        if not isinstance(token, self.keep_together) or '\n' in value:
+            return False
+        # Qualified names and type casts can't be broken anyway.
+        return (len(self.indent) + len(value) <= self.width
+                or (isinstance(token, sql.Identifier)
+                    and not any(c.isspace() for c in value)))
+
+    @staticmethod
+    def _can_break(tlist, token, prev):
+        """Whether a line may be broken between *prev* and *token*."""
+        if token.match(T.Punctuation, (',', ';', ')', '.', '::')):
+            return False
+        if prev is not None and prev.match(T.Punctuation, ('(', '.', '::')):
+            return False
+        # The parenthesis of a function call, either as a whole or its
+        # opening bracket.
+        if isinstance(token, sql.Parenthesis):
+            return not isinstance(tlist, sql.Function)
+        if token.match(T.Punctuation, '(') and token is tlist.tokens[0]:
+            return not isinstance(tlist.parent, sql.Function)
+        return True
+
+    def _process(self, tlist):
+        tokens = []
+        changed = False
+        for token in tlist.tokens:
+            value = str(token)
+            if token.is_group and not self._keep(token, value):
+                self._process(token)
+                tokens.append(token)
+                continue
+
+            if token.is_whitespace:
+                if self._at_line_start and '\n' not in value:
+                    self.indent += value
+            else:
+                line = value.split('\n', 1)[0]
+                if self.column > len(self.indent) \
+                        and self.column + len(line) > self.width \
+                        and self._can_break(tlist, token, self._prev):
+                    # Trailing whitespace is replaced by the line break.
+                    if tokens and tokens[-1].ttype is T.Whitespace \
+                            and '\n' not in tokens[-1].value:
+                        tokens.pop()
+                    newline = sql.Token(T.Whitespace, f'\n{self.indent}')
+                    newline.parent = tlist
+                    tokens.append(newline)
+                    self.column = len(self.indent)
+                    changed = True
+                self._at_line_start = False
+                self._prev = token
+
+            pos = value.rfind('\n')
+            if pos < 0:
+                self.column += len(value)
             else:
-                val = str(token)
-                if len(self.line) + len(val) > self.width:
-                    match = re.search(r'^ +', self.line)
-                    if match is not None:
-                        indent = match.group()
-                    else:
-                        indent = ''
-                    yield sql.Token(T.Whitespace, f'\n{indent}')
-                    self.line = indent
-                self.line += val
-            yield token
-
-    def process(self, group):
-        # return
-        # group.tokens = self._process(group, group.tokens)
-        raise NotImplementedError
+                self.column = len(value) - pos - 1
+                self.indent = value[pos + 1:] if token.is_whitespace else ''
+                self._at_line_start = True
+            tokens.append(token)
+
+        if changed:
+            tlist.tokens = tokens
+
+    def process(self, stmt):
+        self._process(stmt)
+        return stmt
@@ -5,21 +5,35 @@
 # This module is part of python-sqlparse and is released under
 # the BSD License: https://opensource.org/licenses/BSD-3-Clause
 
+from itertools import starmap
+
 from sqlparse import tokens as T
 
 
-class _CaseFilter:
+class _TokenFilter:
+    """Base class of filters that handle one token at a time.
+
+    Subclasses implement ``process_token(ttype, value)`` returning the
+    new ``(ttype, value)`` pair.  The filter stack calls it directly and
+    fuses consecutive filters of this kind into a single function instead
+    of chaining their streams.
+    """
+
+    def process(self, stream):
+        return starmap(self.process_token, stream)
+
+
+class _CaseFilter(_TokenFilter):
     ttype = None
 
     def __init__(self, case=None):
         case = case or 'upper'
         self.convert = getattr(str, case)
 
-    def process(self, stream):
-        for ttype, value in stream:
-            if ttype in self.ttype:
-                value = self.convert(value)
-            yield ttype, value
+    def process_token(self, ttype, value):
+        if ttype in self.ttype:
+            value = self.convert(value)
+        return ttype, value
 
 
 class KeywordCaseFilter(_CaseFilter):
@@ -29,31 +43,149 @@ class KeywordCaseFilter(_CaseFilter):
 class IdentifierCaseFilter(_CaseFilter):
     ttype = T.Name, T.String.Symbol
 
-    def process(self, stream):
-        for ttype, value in stream:
-            if ttype in self.ttype and value.strip()[0] != '"':
-                value = self.convert(value)
-            yield ttype, value
+    def process_token(self, ttype, value):
+        if ttype in self.ttype and value.strip()[0] != '"':
+            value = self.convert(value)
+        return ttype, value
 
 
-class TruncateStringFilter:
+class TruncateStringFilter(_TokenFilter):
     def __init__(self, width, char):
         self.width = width
         self.char = char
 
-    def process(self, stream):
+    def process_token(self, ttype, value):
+        if ttype != T.Literal.String.Single:
+            return ttype, value
+
+        if value[:2] == "''":
+            inner = value[2:-2]
+            quote = "''"
+        else:
+            inner = value[1:-1]
+            quote = "'"
+
+        if len(inner) > self.width:
+            value = ''.join((quote, inner[:self.width], self.char, quote))
+        return ttype, value
+
+
+class FingerprintFilter:
+    """Normalizes statements so that queries differing only in their
+    constants become equal.
+
+    Comments are removed, literals and placeholders are replaced by ``?``
+    and lists of them after ``IN`` and ``VALUES`` by ``(...)``, keywords
+    are upper-cased and whitespace is normalized to a single space
+    between tokens where needed.  Trailing semicolons are dropped.
+    """
+
+    placeholder = '?'
+    list_placeholder = '(...)'
+
+    _NO_SPACE_BEFORE = frozenset((',', ')', ']', ';', '.', '::'))
+    _NO_SPACE_AFTER = frozenset(('(', '[', '.', '::'))
+
+    def _tokens(self, stream):
+        """Drops whitespace and comments, normalizes keywords and replaces
+        literals."""
+        prev = None
         for ttype, value in stream:
-            if ttype != T.Literal.String.Single:
-                yield ttype, value
+            if ttype in T.Whitespace or ttype in T.Comment:
                 continue
+            if ttype in T.Keyword or ttype in T.Name.Builtin:
+                value = ' '.join(value.upper().split())
+            elif (ttype in T.Number or ttype in T.String.Single
+                  or ttype is T.Literal or ttype in T.Name.Placeholder):
+                # "a -1" is lexed as name and number, but it's a
+                # subtraction.
+                if value[0] == '-' and prev is not None and (
+                        prev[0] in T.Name or prev[0] in T.Literal
+                        or prev == (T.Punctuation, ')')):
+                    yield T.Operator, '-'
+                ttype, value = T.Name.Placeholder, self.placeholder
+            prev = ttype, value
+            yield prev
 
-            if value[:2] == "''":
-                inner = value[2:-2]
-                quote = "''"
-            else:
-                inner = value[1:-1]
-                quote = "'"
+    def _lists(self, stream):
+        """Collapses parenthesized lists of placeholders following ``IN``
+        and ``VALUES``, merging the rows of a ``VALUES`` list."""
+        prev = None
+        # Tokens of a list that may be collapsed, starting with "(".
+        candidate = None
+        # The comma after a collapsed VALUES row, held back until it's
+        # clear whether another row follows.
+        comma = None
+        in_values = False
+        for token in stream:
+            ttype, value = token
+            if candidate is not None:
+                if ttype is T.Name.Placeholder or value == ',':
+                    candidate.append(token)
+                    continue
+                if value == ')' and len(candidate) > 1:
+                    if comma is None:
+                        yield T.Name.Placeholder, self.list_placeholder
+                        prev = T.Name.Placeholder, self.list_placeholder
+                    comma = candidate = None
+                    continue
+                # Not a plain list, process its tokens as usual.
+                if comma is not None:
+                    yield comma
+                    comma = None
+                yield from candidate
+                prev = candidate[-1]
+                candidate = None
+                in_values = False
+            elif comma is not None:
+                if value == '(':
+                    candidate = [token]
+                    continue
+                yield comma
+                prev, comma, in_values = comma, None, False
 
-            if len(inner) > self.width:
-                value = ''.join((quote, inner[:self.width], self.char, quote))
+            if value == '(' and ttype is T.Punctuation and prev is not None \
+                    and prev[0] in T.Keyword and prev[1] in ('IN', 'VALUES'):
+                candidate = [token]
+                in_values = prev[1] == 'VALUES'
+                continue
+            if value == ',' and in_values and prev == (
+                    T.Name.Placeholder, self.list_placeholder):
+                comma = token
+                continue
+            in_values = False
+            prev = token
+            yield token
+
+        if candidate is not None:
+            if comma is not None:
+                yield comma
+            yield from candidate
+        elif comma is not None:
+            yield comma
+
+    def process(self, stream):
+        prev = None
+        semicolons = []
+        for ttype, value in self._lists(self._tokens(stream)):
+            if ttype is T.Punctuation and value == ';':
+                semicolons.append((ttype, value))
+                continue
+            if semicolons:
+                yield from semicolons
+                prev, semicolons = semicolons[-1], []
+            if prev is not None and self._is_spaced(prev, ttype, value):
+                yield T.Whitespace, ' '
             yield ttype, value
+            prev = ttype, value
+
+    def _is_spaced(self, prev, ttype, value):
+        if ttype is T.Punctuation:
+            if value in self._NO_SPACE_BEFORE:
+                return False
+            if value == '(' and prev[0] in T.Name \
+                    and prev[0] is not T.Name.Placeholder:
+                # Function call
+                return False
+        return not (prev[0] is T.Punctuation
+                    and prev[1] in self._NO_SPACE_AFTER)
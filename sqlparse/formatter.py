@@ -7,7 +7,9 @@
 
 """SQL formatter"""
 
-from sqlparse import filters
+from threading import Lock
+
+from sqlparse import cache, engine, filters
 from sqlparse.exceptions import SQLParseError
 
 
@@ -154,17 +156,24 @@ def build_filter_stack(stack, options):
         stack.preprocess.append(filters.TruncateStringFilter(
             width=options['truncate_strings'], char=options['truncate_char']))
 
+    # Each filter only enables the grouping passes it relies on.
     if options.get('use_space_around_operators', False):
-        stack.enable_grouping()
+        stack.enable_grouping('operators')
         stack.stmtprocess.append(filters.SpacesAroundOperatorsFilter())
 
     # After grouping
     if options.get('strip_comments'):
-        stack.enable_grouping()
-        stack.stmtprocess.append(filters.StripCommentsFilter())
+        # Stripping comments alone doesn't need grouped statements.
+        grouped = any(options.get(option) for option in (
+            'use_space_around_operators', 'strip_whitespace', 'reindent',
+            'reindent_aligned', 'right_margin'))
+        if grouped:
+            # How comments are replaced depends on the groups around them.
+            stack.enable_grouping()
+        stack.stmtprocess.append(filters.StripCommentsFilter(grouped))
 
     if options.get('strip_whitespace') or options.get('reindent'):
-        stack.enable_grouping()
+        stack.enable_grouping('identifiers')
         stack.stmtprocess.append(filters.StripWhitespaceFilter())
 
     if options.get('reindent'):
@@ -202,3 +211,58 @@ def build_filter_stack(stack, options):
             stack.postprocess.append(fltr)
 
     return stack
+
+
+class Formatter:
+    """Formats SQL according to a fixed set of options.
+
+    The options, documented in :ref:`formatting`, are validated and the
+    filters are set up once, which saves the setup :func:`sqlparse.format`
+    goes through on every call.  A formatter can be reused as often as
+    needed and shared between threads, its filters are reset before each
+    call.
+
+    :raises SQLParseError: if an option is invalid.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._key = tuple(sorted(options.items()))
+        self._stack = build_filter_stack(
+            engine.FilterStack(), validate_options(dict(options)))
+        self._stack.postprocess.append(filters.SerializerUnicode())
+        self._lock = Lock()
+
+    def __repr__(self):
+        options = ', '.join(f'{name}={value!r}' for name, value in self._key)
+        return f'{self.__class__.__name__}({options})'
+
+    def __getstate__(self):
+        # The filters aren't needed to set up the formatter again.
+        return self.options
+
+    def __setstate__(self, options):
+        self.__init__(**options)
+
+    def format(self, sql, encoding=None):
+        """Formats *sql*, a string or the path of a file to read the
+        statements from, like :func:`sqlparse.format` does.
+
+        :returns: The formatted SQL as string.
+        """
+        if isinstance(sql, (str, bytes)):
+            key = ('format', sql, encoding, self._key)
+            return cache.cached(key, lambda: self._format(sql, encoding))
+        return self._format(sql, encoding)
+
+    def format_many(self, sqls, encoding=None):
+        """Formats each of *sqls*.
+
+        :returns: A list of formatted strings, in the order of *sqls*.
+        """
+        return [self.format(sql, encoding) for sql in sqls]
+
+    def _format(self, sql, encoding):
+        with self._lock:
+            self._stack.reset()
+            return ''.join(self._stack.run(sql, encoding))
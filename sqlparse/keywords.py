@@ -116,13 +116,20 @@ def find_delimited_spans(text):
     return DelimitedSpans(openers, closers)
 
 
+# By default whitespace is lexed one character at a time (note the lazy
+# quantifier), so indentation turns into a token per character.  A lexer
+# with whitespace runs enabled uses this pattern in its place instead and
+# emits a single token for whitespace up to the next line break.
+SQL_REGEX_WHITESPACE = (r'\s+?', tokens.Whitespace)
+SQL_REGEX_WHITESPACE_RUN = (r'[^\S\r\n]+', tokens.Whitespace)
+
 SQL_REGEX = [
     (r'(--|# )\+.*?(\r\n|\r|\n|$)', tokens.Comment.Single.Hint),
 
     (r'(--|# ).*?(\r\n|\r|\n|$)', tokens.Comment.Single),
 
     (r'(\r\n|\r|\n)', tokens.Newline),
-    (r'\s+?', tokens.Whitespace),
+    SQL_REGEX_WHITESPACE,
 
     (r':=', tokens.Assignment),
     (r'::', tokens.Punctuation),
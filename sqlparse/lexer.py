@@ -6,6 +6,7 @@
 # the BSD License: https://opensource.org/licenses/BSD-3-Clause
 
 """SQL Lexer"""
+import os
 import re
 
 # This code is based on the SqlLexer in pygments.
@@ -15,8 +16,223 @@ import re
 from io import TextIOBase
 from threading import Lock
 
-from sqlparse import keywords, tokens
-from sqlparse.utils import consume
+from sqlparse import cache, keywords, tokens
+from sqlparse.utils import decode, is_utf8
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+_FLAGS = re.IGNORECASE | re.UNICODE
+
+# Upper bound for the number of distinct spellings Lexer.is_keyword()
+# remembers.  The cache is simply emptied when it's full.
+_KEYWORD_CACHE_SIZE = 10000
+
+# Number of characters read at once when tokenizing a file-like object.
+CHUNK_SIZE = 64 * 1024
+
+# Characters opening a quoted name or a string literal.  An unclosed one
+# is tokenized as an error.
+_QUOTES = frozenset('\'"`\u00b4')
+_NO_BRACKET_NAME_AFTER = re.compile(r'[\w\])]')
+# Tokens that may stand between a semicolon and the line break a stream
+# is cut at.
+_SEPARATORS = frozenset((
+    tokens.Whitespace, tokens.Newline, tokens.Comment.Single,
+    tokens.Comment.Single.Hint, tokens.Comment.Multiline,
+    tokens.Comment.Multiline.Hint))
+
+# Patterns that cannot be embedded into a larger alternation without
+# changing their meaning: numbered backreferences and conditional groups
+# address groups by position, which shifts once other patterns precede
+# them; named groups would clash between patterns and inline global flags
+# are only allowed at the very start of a regex.
+_UNMERGEABLE_REGEX = re.compile(r'\\\d|\(\?\(|\(\?P[<=]|\(\?[aiLmsux]+\)')
+
+
+class _SingleAction(dict):
+    """Action lookup for a pattern that is matched on its own: whatever
+    group matched last, the pattern maps to a single action."""
+
+    def __init__(self, action):
+        super().__init__()
+        self.action = action
+
+    def __missing__(self, key):
+        return self.action
+
+
+def _compile_matchers(SQL_REGEX, flags):
+    """Compile ``(regex, action)`` pairs into as few matchers as possible.
+
+    Consecutive patterns are joined into one alternation with every
+    pattern wrapped in its own capturing group.  Alternatives are tried
+    in order at the same position, so the first pattern that matches wins
+    just as it would when trying the patterns one by one, and the number
+    of its wrapping group -- ``m.lastindex``, since the outermost group
+    closes last -- tells which one it was.
+
+    Returns a list of ``(match, actions)`` pairs, where ``actions`` maps
+    ``m.lastindex`` to the token type or ``PROCESS_AS_KEYWORD``.
+    """
+    matchers = []
+    run = []
+
+    def flush():
+        if not run:
+            return
+        actions = {}
+        group = 1
+        for rx, action in run:
+            actions[group] = action
+            group += re.compile(rx, flags).groups + 1
+        pattern = '|'.join(f'({rx})' for rx, _ in run)
+        matchers.append((re.compile(pattern, flags).match, actions))
+        run.clear()
+
+    for rx, action in SQL_REGEX:
+        if _UNMERGEABLE_REGEX.search(rx) is None \
+                and not _matches_empty(rx, flags):
+            run.append((rx, action))
+        else:
+            flush()
+            matchers.append(
+                (re.compile(rx, flags).match, _SingleAction(action)))
+    flush()
+    return matchers
+
+
+def _matches_empty(rx, flags):
+    """Whether *rx* may match the empty string.
+
+    An empty match is skipped by the lexer, but within an alternation it
+    would also hide the patterns after it, so such patterns are matched
+    on their own.
+    """
+    return sre_parse.parse(rx, flags).getwidth()[0] == 0
+
+
+_ASCII = frozenset(map(chr, range(128)))
+_ASCII_LETTERS = frozenset(c for c in _ASCII if c.isalpha())
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: r'\d',
+    sre_constants.CATEGORY_NOT_DIGIT: r'\D',
+    sre_constants.CATEGORY_SPACE: r'\s',
+    sre_constants.CATEGORY_NOT_SPACE: r'\S',
+    sre_constants.CATEGORY_WORD: r'\w',
+    sre_constants.CATEGORY_NOT_WORD: r'\W',
+}
+_REPEATS = tuple(getattr(sre_constants, op) for op in (
+    'MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_constants, op))
+_ZERO_WIDTH = (sre_constants.ASSERT, sre_constants.ASSERT_NOT,
+               sre_constants.AT)
+
+
+def _ascii_range(lo, hi, ignorecase):
+    chars = {c for c in _ASCII if lo <= ord(c) <= hi}
+    if ignorecase:
+        chars.update(c for c in _ASCII_LETTERS
+                     if lo <= ord(c.lower()) <= hi
+                     or lo <= ord(c.upper()) <= hi)
+        if hi > 127 and (hi - max(lo, 128) > 1000 or any(
+                chr(i).isalpha() for i in range(max(lo, 128), hi + 1))):
+            # Case folding relates a few non-ASCII letters to ASCII ones
+            # (e.g. the Kelvin sign and "k"), don't try to be clever.
+            chars.update(_ASCII_LETTERS)
+    return chars
+
+
+def _first_set(items, ignorecase):
+    """Return ``(chars, nullable)`` for a parsed regex sequence, where
+    `chars` holds the ASCII characters a match can start with or is None
+    if that can't be told."""
+    chars = set()
+    for op, av in items:
+        nullable = False
+        if op is sre_constants.LITERAL:
+            chars |= _ascii_range(av, av, ignorecase)
+        elif op in (sre_constants.NOT_LITERAL, sre_constants.ANY):
+            chars |= _ASCII
+        elif op is sre_constants.IN:
+            for in_op, in_av in av:
+                if in_op is sre_constants.LITERAL:
+                    chars |= _ascii_range(in_av, in_av, ignorecase)
+                elif in_op is sre_constants.RANGE:
+                    chars |= _ascii_range(*in_av, ignorecase)
+                elif in_op is sre_constants.CATEGORY \
+                        and in_av in _CATEGORIES:
+                    category = re.compile(_CATEGORIES[in_av])
+                    chars.update(c for c in _ASCII if category.match(c))
+                else:
+                    # NEGATE and anything more exotic.
+                    chars |= _ASCII
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                branch_chars, branch_nullable = _first_set(branch, ignorecase)
+                if branch_chars is None:
+                    return None, True
+                chars |= branch_chars
+                nullable = nullable or branch_nullable
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if add_flags or del_flags:
+                return None, True
+            sub_chars, nullable = _first_set(sub, ignorecase)
+            if sub_chars is None:
+                return None, True
+            chars |= sub_chars
+        elif op in _REPEATS:
+            min_, _, sub = av
+            sub_chars, nullable = _first_set(sub, ignorecase)
+            if sub_chars is None:
+                return None, True
+            chars |= sub_chars
+            nullable = nullable or min_ == 0
+        elif op in _ZERO_WIDTH:
+            # Assertions only ever narrow down what can match here.
+            nullable = True
+        else:
+            return None, True
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _first_chars(rx, flags):
+    """Return the ASCII characters a match of `rx` can start with.
+
+    The result is a superset: it is only used to skip patterns that
+    cannot possibly match at a given position.  None is returned if the
+    set can't be derived, e.g. for patterns that may match the empty
+    string or use backreferences.
+    """
+    try:
+        ignorecase = bool(re.compile(rx, flags).flags & re.IGNORECASE)
+        chars, nullable = _first_set(sre_parse.parse(rx, flags), ignorecase)
+    except (re.error, TypeError, ValueError):
+        return None
+    if chars is None or nullable:
+        return None
+    return frozenset(chars)
+
+
+def _is_unclosed(text, pos, ttype, value, delimited_spans):
+    """Tells whether the token at ``pos`` is missing its closing delimiter.
+
+    Such a token may still be closed by text that hasn't been read yet.
+    """
+    if pos in delimited_spans.openers:
+        return delimited_spans.resolve(pos) is None
+    if ttype is tokens.Error:
+        return value in _QUOTES
+    if ttype is tokens.Punctuation and value == '[':
+        return not (pos and _NO_BRACKET_NAME_AFTER.match(text, pos - 1))
+    return False
 
 
 class Lexer:
@@ -26,6 +242,9 @@ class Lexer:
     _default_instance = None
     _lock = Lock()
 
+    _whitespace_runs = False
+    _regex_source = ()
+
     # Development notes:
     # - This class is prepared to be able to support additional SQL dialects
     #   in the future by adding additional functions that take the place of
@@ -74,21 +293,120 @@ class Lexer:
         Useful if you want to load a reduced set of syntax configurations.
         After this call, regexps and keyword dictionaries need to be loaded
         to make the lexer functional again."""
+        cache.invalidate()
+        self._whitespace_runs = False
+        self._regex_source = ()
         self._SQL_REGEX = []
+        self._matchers = []
+        self._first_chars = []
+        self._dispatch = {}
+        self._subsets = {}
         self._keywords = []
+        self._keyword_lookup = None
+        self._keyword_cache = {}
 
     def set_SQL_REGEX(self, SQL_REGEX):
         """Set the list of regex that will parse the SQL."""
-        FLAGS = re.IGNORECASE | re.UNICODE
+        cache.invalidate()
+        self._regex_source = tuple(SQL_REGEX)
+        if self._whitespace_runs:
+            SQL_REGEX = [
+                keywords.SQL_REGEX_WHITESPACE_RUN
+                if regex == keywords.SQL_REGEX_WHITESPACE else regex
+                for regex in SQL_REGEX]
         self._SQL_REGEX = [
-            (re.compile(rx, FLAGS).match, tt)
+            (re.compile(rx, _FLAGS).match, tt)
             for rx, tt in SQL_REGEX
         ]
+        self._matchers = _compile_matchers(SQL_REGEX, _FLAGS)
+
+        # Most patterns can only match on a handful of leading characters,
+        # see _get_matchers().
+        self._first_chars = [
+            (rx, tt, _first_chars(rx, _FLAGS)) for rx, tt in SQL_REGEX]
+        self._dispatch = {}
+        self._subsets = {}
+
+    def set_whitespace_runs(self, enabled=True):
+        """Emit one whitespace token per run of whitespace.
+
+        By default every whitespace character becomes a token of its own.
+        When enabled, consecutive whitespace up to the next line break is
+        emitted as a single token instead, which considerably reduces the
+        number of tokens for indented SQL.  Line breaks are still emitted
+        as separate newline tokens.  This replaces
+        ``keywords.SQL_REGEX_WHITESPACE`` in the list of regex, custom
+        lists without that entry are not affected.
+
+        The setting is reverted by :meth:`clear` and
+        :meth:`default_initialization`.
+        """
+        self._whitespace_runs = enabled
+        self.set_SQL_REGEX(self._regex_source)
+
+    def get_config(self):
+        """Returns the syntax configuration in a form that can be pickled,
+        e.g. to set up the lexer of another process with :meth:`set_config`.
+
+        ``PROCESS_AS_KEYWORD`` is a plain object that wouldn't survive
+        pickling, it's replaced by ``None``.
+        """
+        regex = tuple(
+            (rx, None if tt is keywords.PROCESS_AS_KEYWORD else tt)
+            for rx, tt in self._regex_source)
+        return regex, self._whitespace_runs, tuple(self._keywords)
+
+    def set_config(self, config):
+        """Loads a configuration returned by :meth:`get_config`."""
+        regex, whitespace_runs, keyword_dicts = config
+        self.clear()
+        self._whitespace_runs = whitespace_runs
+        self.set_SQL_REGEX([
+            (rx, keywords.PROCESS_AS_KEYWORD if tt is None else tt)
+            for rx, tt in regex])
+        for kwdict in keyword_dicts:
+            self.add_keywords(kwdict)
+
+    def _get_matchers(self, char):
+        """Return the matchers to try at a position starting with `char`.
+
+        For an ASCII character these hold just the patterns that may match
+        on it, in their original order; patterns whose leading characters
+        can't be derived are kept everywhere.  Other characters use the
+        full list.  Results are cached per character and shared between
+        characters selecting the same patterns.
+        """
+        if char not in _ASCII:
+            return self._matchers
+        subset = tuple(
+            (rx, tt) for rx, tt, chars in self._first_chars
+            if chars is None or char in chars)
+        matchers = self._subsets.get(subset)
+        if matchers is None:
+            matchers = _compile_matchers(subset, _FLAGS)
+            self._subsets[subset] = matchers
+        self._dispatch[char] = matchers
+        return matchers
 
     def add_keywords(self, keywords):
         """Add keyword dictionaries. Keywords are looked up in the same order
-        that dictionaries were added."""
+        that dictionaries were added.
+
+        The dictionaries are merged into a single lookup table on first
+        use. Changes to a dictionary after it was added are only picked
+        up once keywords are added again or the lexer is re-initialized."""
+        cache.invalidate()
         self._keywords.append(keywords)
+        self._keyword_lookup = None
+        self._keyword_cache = {}
+
+    def _build_keyword_lookup(self):
+        """Merge the keyword dictionaries, earlier ones taking precedence."""
+        lookup = {}
+        for kwdict in reversed(self._keywords):
+            lookup.update(kwdict)
+        self._keyword_lookup = lookup
+        return lookup
 
     def is_keyword(self, value):
         """Checks for a keyword.
@@ -96,12 +414,17 @@ class Lexer:
         If the given value is in one of the KEYWORDS_* dictionary
         it's considered a keyword. Otherwise, tokens.Name is returned.
         """
-        val = value.upper()
-        for kwdict in self._keywords:
-            if val in kwdict:
-                return kwdict[val], value
-        else:
-            return tokens.Name, value
+        spellings = self._keyword_cache
+        ttype = spellings.get(value)
+        if ttype is None:
+            lookup = self._keyword_lookup
+            if lookup is None:
+                lookup = self._build_keyword_lookup()
+            ttype = lookup.get(value.upper(), tokens.Name)
+            if len(spellings) >= _KEYWORD_CACHE_SIZE:
+                spellings.clear()
+            spellings[value] = ttype
+        return ttype, value
 
     def get_tokens(self, text, encoding=None):
         """
@@ -117,26 +440,38 @@ class Lexer:
         ``stack`` is the initial stack (default: ``['root']``)
         """
         if isinstance(text, TextIOBase):
-            text = text.read()
+            yield from self._get_stream_tokens(text)
+            return
+        if isinstance(text, os.PathLike):
+            if encoding or is_utf8(text, CHUNK_SIZE):
+                with open(text, encoding=encoding or 'utf-8') as stream:
+                    yield from self._get_stream_tokens(stream)
+                return
+            # Decoded like bytes below, which takes the whole file.
+            with open(text, 'rb') as f:
+                text = f.read()
 
         if isinstance(text, str):
             pass
         elif isinstance(text, bytes):
-            if encoding:
-                text = text.decode(encoding)
-            else:
-                try:
-                    text = text.decode('utf-8')
-                except UnicodeDecodeError:
-                    text = text.decode('unicode-escape')
+            text = decode(text, encoding)
         else:
-            raise TypeError(f"Expected text or file-like object, got {type(text)!r}")
+            raise TypeError(
+                f"Expected text, file-like object or path, got {type(text)!r}")
+
+        yield from self._lex(text, 0, keywords.find_delimited_spans(text))
 
-        delimited_spans = keywords.find_delimited_spans(text)
+    def _lex(self, text, pos, delimited_spans):
+        """Yields the (tokentype, value) pairs of ``text[pos:]``.
+
+        The characters before ``pos`` are only context for look-behind
+        assertions and are not tokenized.
+        """
         span_openers = delimited_spans.openers
+        dispatch = self._dispatch
 
-        iterable = enumerate(text)
-        for pos, char in iterable:
+        text_len = len(text)
+        while pos < text_len:
             # Only positions the lexer actually reaches may open a
             # dollar-quoted literal or a multiline comment; a delimiter
             # inside a string literal or behind a "--" comment is skipped
@@ -146,23 +481,92 @@ class Lexer:
                 if resolved is not None:
                     end, ttype = resolved
                     yield ttype, text[pos:end]
-                    consume(iterable, end - pos - 1)
+                    pos = end
                     continue
 
-            for rexmatch, action in self._SQL_REGEX:
+            char = text[pos]
+            matchers = dispatch.get(char) or self._get_matchers(char)
+            for rexmatch, actions in matchers:
                 m = rexmatch(text, pos)
-
                 if not m:
                     continue
-                elif isinstance(action, tokens._TokenType):
+
+                end = m.end()
+                if end == pos:
+                    # An empty match would never advance the position.
+                    continue
+
+                action = actions[m.lastindex]
+                if isinstance(action, tokens._TokenType):
                     yield action, m.group()
                 elif action is keywords.PROCESS_AS_KEYWORD:
                     yield self.is_keyword(m.group())
 
-                consume(iterable, m.end() - pos - 1)
+                pos = end
                 break
             else:
                 yield tokens.Error, char
+                pos += 1
+
+    def _get_stream_tokens(self, stream):
+        """Tokenizes a file-like object, reading it in chunks.
+
+        The text read so far is tokenized and the tokens are handed out up
+        to the last line break following a semicolon.  Nothing a pattern
+        could match spans such a line break, except for quoted names,
+        string literals, dollar-quoted literals and multiline comments --
+        and those are only trusted once they are closed within the text
+        read so far.  Whatever follows the cut is tokenized again together
+        with the next chunk.  If there's no place to cut, the next read is
+        twice as large, so a long statement is not tokenized over and over.
+        """
+        text = ''
+        pos = 0
+        size = CHUNK_SIZE
+        while True:
+            chunk = stream.read(size)
+            if not chunk:
+                break
+            text += chunk
+
+            delimited_spans = keywords.find_delimited_spans(text)
+            pending = []
+            cut = None
+            after_semicolon = False
+            start = pos
+            span_openers = delimited_spans.openers
+            for token in self._lex(text, pos, delimited_spans):
+                ttype, value = token
+                if ((ttype is tokens.Error or ttype is tokens.Punctuation
+                     or start in span_openers)
+                        and _is_unclosed(text, start, ttype, value,
+                                         delimited_spans)):
+                    break
+                pending.append(token)
+                start += len(value)
+                if ttype is tokens.Punctuation and value == ';':
+                    after_semicolon = True
+                elif ttype in _SEPARATORS:
+                    # A line break right at the end could still turn out
+                    # to be the first half of a "\r\n".
+                    if (after_semicolon and value[-1] in '\r\n'
+                            and start < len(text)):
+                        cut = len(pending), start
+                else:
+                    after_semicolon = False
+
+            if cut is None:
+                size *= 2
+                continue
+
+            count, end = cut
+            yield from pending[:count]
+            # Keep the line break in front as context for look-behinds.
+            text = text[end - 1:]
+            pos = 1
+            size = CHUNK_SIZE
+
+        yield from self._lex(text, pos, keywords.find_delimited_spans(text))
 
 
 def tokenize(sql, encoding=None):
@@ -0,0 +1,30 @@
+#
+# Copyright (C) 2009-2020 the sqlparse authors and contributors
+# <see AUTHORS file>
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: https://opensource.org/licenses/BSD-3-Clause
+
+"""Worker processes for the functions that take a number of processes."""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlparse.lexer import Lexer
+
+
+def _init_worker(config):
+    """Configures the default lexer of a worker process."""
+    Lexer.get_default_instance().set_config(config)
+
+
+def process_pool(processes=None):
+    """Returns a process pool whose workers lex like this process does.
+
+    Worker processes that aren't forked, e.g. on Windows and macOS, start
+    with a fresh default lexer.  The configuration of the default lexer,
+    including keywords and regex added to it, is handed to each worker
+    when it starts.
+    """
+    config = Lexer.get_default_instance().get_config()
+    return ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(config,))
@@ -8,14 +8,23 @@
 """This module contains classes representing syntactical elements of SQL."""
 
 import re
+from bisect import bisect_right
+from operator import attrgetter
 
 from sqlparse import tokens as T
 from sqlparse.utils import imt, remove_quotes
 
+_get_pos = attrgetter('pos')
+
+# (is_keyword, is_whitespace, is_newline) by token type, see Token._make().
+_TTYPE_FLAGS = {}
+
 
 class NameAliasMixin:
     """Implements get_real_name and get_alias."""
 
+    __slots__ = ()
+
     def get_real_name(self):
         """Returns the real name (object name) of this identifier."""
         # a.b.c -> real name is the component after the *last* dot
@@ -45,23 +54,31 @@ class Token:
     It represents a single token and has two instance attributes:
     ``value`` is the unchanged value of the token and ``ttype`` is
     the type of the token.
+
+    Tokens created by the parser additionally know their position:
+    ``pos`` is the offset of the token within the parsed text, or
+    ``None`` for tokens that didn't come from the parsed text, e.g.
+    whitespace inserted by a filter, and for token lists whose text was
+    changed since.
     """
 
     __slots__ = (
+        '_value',
         'is_group',
         'is_keyword',
         'is_newline',
         'is_whitespace',
         'normalized',
         'parent',
+        'pos',
         'ttype',
-        'value',
     )
 
-    def __init__(self, ttype, value):
+    def __init__(self, ttype, value, pos=None):
         value = str(value)
-        self.value = value
+        self._value = value
         self.ttype = ttype
+        self.pos = pos
         self.parent = None
         self.is_group = False
         self.is_keyword = ttype in T.Keyword
@@ -69,6 +86,53 @@ class Token:
         self.is_newline = self.ttype in T.Newline
         self.normalized = value.upper() if self.is_keyword else value
 
+    @classmethod
+    def _make(cls, ttype, value, pos=None):
+        """Creates a token from a *value* that's a string already.
+
+        This is the fast path for tokens built from the lexer output: the
+        flags derived from *ttype* are computed once per token type.
+        """
+        token = object.__new__(cls)
+        try:
+            flags = _TTYPE_FLAGS[ttype]
+        except KeyError:
+            flags = _TTYPE_FLAGS[ttype] = (
+                ttype in T.Keyword, ttype in T.Whitespace, ttype in T.Newline)
+        token.is_keyword, token.is_whitespace, token.is_newline = flags
+        token._value = value
+        token.ttype = ttype
+        token.pos = pos
+        token.parent = None
+        token.is_group = False
+        token.normalized = value.upper() if flags[0] else value
+        return token
+
+    def _copy(self, parent=None):
+        """Returns a copy of this token with *parent* as its parent."""
+        token = object.__new__(type(self))
+        token._value = self._value
+        token.ttype = self.ttype
+        token.pos = self.pos
+        token.parent = parent
+        token.is_group = self.is_group
+        token.is_keyword = self.is_keyword
+        token.is_whitespace = self.is_whitespace
+        token.is_newline = self.is_newline
+        token.normalized = self.normalized
+        return token
+
+    @property
+    def value(self):
+        """The value of the token, see the class docstring."""
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        if self.parent is not None:
+            self.parent._invalidate_value()
+
     def __str__(self):
         return self.value
 
@@ -162,13 +226,73 @@ class TokenList(Token):
     list of child-tokens.
     """
 
-    __slots__ = 'tokens'
+    __slots__ = ('_tokens',)
 
     def __init__(self, tokens=None):
-        self.tokens = tokens or []
-        [setattr(token, 'parent', self) for token in self.tokens]
-        super().__init__(None, ''.join(token.value for token in self.tokens))
+        self._tokens = tokens = tokens or []
+        [setattr(token, 'parent', self) for token in tokens]
+        self.ttype = None
+        self.pos = tokens[0].pos if tokens else None
+        self.parent = None
         self.is_group = True
+        self.is_keyword = self.is_whitespace = self.is_newline = False
+        self._value = None
+
+    @property
+    def value(self):
+        """The joined values of the child tokens.
+
+        It's computed on first access and cached until the tokens of this
+        group or the value of one of its descendants change.  Assigning a
+        new list to ``tokens`` or a new value to a token takes care of
+        that; code that changes ``tokens`` in place has to call
+        ``_invalidate_value()`` afterwards.
+        """
+        value = self._value
+        if value is None:
+            value = self._value = ''.join(
+                token.value for token in self._tokens)
+        return value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+    normalized = value
+
+    @property
+    def tokens(self):
+        """The list of child tokens."""
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, tokens):
+        self._tokens = tokens
+        self._invalidate_value()
+
+    def _invalidate_value(self):
+        """Drops the cached value of this group and its parents.
+
+        Their positions are dropped as well, as their text doesn't match
+        the parsed text anymore.
+        """
+        tlist = self
+        while tlist is not None:
+            tlist._value = None
+            tlist.pos = None
+            tlist = tlist.parent
+
+    def _copy(self, parent=None):
+        """Returns a deep copy of this group with *parent* as its parent."""
+        tlist = object.__new__(type(self))
+        tlist._value = self._value
+        tlist._tokens = [token._copy(tlist) for token in self._tokens]
+        tlist.ttype = None
+        tlist.pos = self.pos
+        tlist.parent = parent
+        tlist.is_group = True
+        tlist.is_keyword = tlist.is_whitespace = tlist.is_newline = False
+        return tlist
 
     def __str__(self):
         return ''.join(token.value for token in self.flatten())
@@ -204,7 +328,21 @@ class TokenList(Token):
                 token._pprint_tree(max_depth, depth + 1, f, _pre + parent_pre)
 
     def get_token_at_offset(self, offset):
-        """Returns the token that is on position offset."""
+        """Returns the token that is on position offset.
+
+        *offset* is relative to the start of this token list.  Tokens are
+        looked up by their position in the parsed text, descending the
+        tree with a binary search on every level.  Token lists without
+        positions, e.g. built by hand or changed by a filter, are scanned
+        token by token instead.
+        """
+        if self.pos is not None:
+            try:
+                return self._token_at_pos(self.pos + offset)
+            except TypeError:
+                # Some token without a position is in the way.
+                pass
+
         idx = 0
         for token in self.flatten():
             end = idx + len(token.value)
@@ -212,6 +350,17 @@ class TokenList(Token):
                 return token
             idx = end
 
+    def _token_at_pos(self, pos):
+        tlist = self
+        while True:
+            idx = bisect_right(tlist.tokens, pos, key=_get_pos) - 1
+            if idx < 0:
+                return None
+            token = tlist.tokens[idx]
+            if not token.is_group:
+                return token if pos < token.pos + len(token.value) else None
+            tlist = token
+
     def flatten(self):
         """Generator yielding ungrouped tokens.
 
@@ -330,7 +479,7 @@ class TokenList(Token):
             grp = start
             grp.tokens.extend(subtokens)
             del self.tokens[start_idx + 1:end_idx]
-            grp.value += ''.join(token.value for token in subtokens)
+            grp._value = None
         else:
             subtokens = self.tokens[start_idx:end_idx]
             grp = grp_cls(subtokens)
@@ -348,6 +497,7 @@ class TokenList(Token):
             where = self.token_index(where)
         token.parent = self
         self.tokens.insert(where, token)
+        self._invalidate_value()
 
     def insert_after(self, where, token, skip_ws=True):
         """Inserts *token* after *where*."""
@@ -359,6 +509,7 @@ class TokenList(Token):
             self.tokens.append(token)
         else:
             self.tokens.insert(nidx, token)
+        self._invalidate_value()
 
     def has_alias(self):
         """Returns ``True`` if an alias is present."""
@@ -411,6 +562,8 @@ class TokenList(Token):
 class Statement(TokenList):
     """Represents a SQL statement."""
 
+    __slots__ = ()
+
     def get_type(self):
         """Returns the type of a statement.
 
@@ -454,6 +607,8 @@ class Identifier(NameAliasMixin, TokenList):
     Identifiers may have aliases or typecasts.
     """
 
+    __slots__ = ()
+
     def is_wildcard(self):
         """Return ``True`` if this identifier contains a wildcard."""
         _, token = self.token_next_by(t=T.Wildcard)
@@ -482,6 +637,8 @@ class Identifier(NameAliasMixin, TokenList):
 class IdentifierList(TokenList):
     """A list of :class:`~sqlparse.sql.Identifier`\'s."""
 
+    __slots__ = ()
+
     def get_identifiers(self):
         """Returns the identifiers.
 
@@ -494,6 +651,8 @@ class IdentifierList(TokenList):
 
 class TypedLiteral(TokenList):
     """A typed literal, such as "date '2001-09-28'" or "interval '2 hours'"."""
+
+    __slots__ = ()
     M_OPEN = [(T.Name.Builtin, None), (T.Keyword, "TIMESTAMP")]
     M_CLOSE = T.String.Single, None
     M_EXTEND = T.Keyword, ("DAY", "HOUR", "MINUTE", "MONTH", "SECOND", "YEAR")
@@ -501,6 +660,8 @@ class TypedLiteral(TokenList):
 
 class Parenthesis(TokenList):
     """Tokens between parenthesis."""
+
+    __slots__ = ()
     M_OPEN = T.Punctuation, '('
     M_CLOSE = T.Punctuation, ')'
 
@@ -511,6 +672,8 @@ class Parenthesis(TokenList):
 
 class SquareBrackets(TokenList):
     """Tokens between square brackets"""
+
+    __slots__ = ()
     M_OPEN = T.Punctuation, '['
     M_CLOSE = T.Punctuation, ']'
 
@@ -522,15 +685,21 @@ class SquareBrackets(TokenList):
 class Assignment(TokenList):
     """An assignment like 'var := val;'"""
 
+    __slots__ = ()
+
 
 class If(TokenList):
     """An 'if' clause with possible 'else if' or 'else' parts."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, 'IF'
     M_CLOSE = T.Keyword, 'END IF'
 
 
 class For(TokenList):
     """A 'FOR' loop."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, ('FOR', 'FOREACH')
     M_CLOSE = T.Keyword, 'END LOOP'
 
@@ -538,6 +707,8 @@ class For(TokenList):
 class Comparison(TokenList):
     """A comparison used for example in WHERE clauses."""
 
+    __slots__ = ()
+
     @property
     def left(self):
         return self.tokens[0]
@@ -550,12 +721,16 @@ class Comparison(TokenList):
 class Comment(TokenList):
     """A comment."""
 
+    __slots__ = ()
+
     def is_multiline(self):
         return self.tokens and self.tokens[0].ttype == T.Comment.Multiline
 
 
 class Where(TokenList):
     """A WHERE clause."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, 'WHERE'
     M_CLOSE = T.Keyword, (
         'ORDER BY', 'GROUP BY', 'LIMIT', 'UNION', 'UNION ALL', 'EXCEPT',
@@ -564,17 +739,23 @@ class Where(TokenList):
 
 class Over(TokenList):
     """An OVER clause."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, 'OVER'
 
 
 class Having(TokenList):
     """A HAVING clause."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, 'HAVING'
     M_CLOSE = T.Keyword, ('ORDER BY', 'LIMIT')
 
 
 class Case(TokenList):
     """A CASE statement with one or more WHEN and possibly an ELSE part."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, 'CASE'
     M_CLOSE = T.Keyword, 'END'
 
@@ -626,6 +807,8 @@ class Case(TokenList):
 class Function(NameAliasMixin, TokenList):
     """A function or procedure call."""
 
+    __slots__ = ()
+
     def get_parameters(self):
         """Return a list of parameters."""
         parenthesis = self.token_next_by(i=Parenthesis)[1]
@@ -648,6 +831,8 @@ class Function(NameAliasMixin, TokenList):
 
 class Begin(TokenList):
     """A BEGIN/END block."""
+
+    __slots__ = ()
     M_OPEN = T.Keyword, 'BEGIN'
     M_CLOSE = T.Keyword, 'END'
 
@@ -655,10 +840,16 @@ class Begin(TokenList):
 class Operation(TokenList):
     """Grouping of operations"""
 
+    __slots__ = ()
+
 
 class Values(TokenList):
     """Grouping of values"""
 
+    __slots__ = ()
+
 
 class Command(TokenList):
     """Grouping of CLI commands."""
+
+    __slots__ = ()
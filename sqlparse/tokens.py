@@ -11,12 +11,28 @@
 
 """Tokens"""
 
+from itertools import count
+
+# Every token type gets a bit of its own.  A token type's mask has the
+# bits of the type itself and of all its parents set, which turns the
+# containment check into a single bit test.
+_bits = (1 << i for i in count())
+
 
 class _TokenType(tuple):
     parent = None
 
+    def __init__(self, *args):
+        self._bit = self._mask = next(_bits)
+
     def __contains__(self, item):
-        return item is not None and (self is item or item[:len(self)] == self)
+        if item is None:
+            return False
+        try:
+            return (item._mask & self._bit) != 0
+        except AttributeError:
+            # A plain tuple
+            return item[:len(self)] == self
 
     def __getattr__(self, name):
         # don't mess with dunder
@@ -25,13 +41,25 @@ class _TokenType(tuple):
         new = _TokenType(self + (name,))
         setattr(self, name, new)
         new.parent = self
+        new._mask |= self._mask
         return new
 
+    def __reduce__(self):
+        # Token types are singletons, unpickling must not create new ones.
+        return _get_token_type, (tuple(self),)
+
     def __repr__(self):
         # self can be False only if its the `root` i.e. Token itself
         return 'Token' + ('.' if self else '') + '.'.join(self)
 
 
+def _get_token_type(names):
+    ttype = Token
+    for name in names:
+        ttype = getattr(ttype, name)
+    return ttype
+
+
 Token = _TokenType()
 
 # Special token types
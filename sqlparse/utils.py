@@ -5,10 +5,12 @@
 # This module is part of python-sqlparse and is released under
 # the BSD License: https://opensource.org/licenses/BSD-3-Clause
 
+import codecs
 import itertools
 import re
 from collections import deque
 from contextlib import contextmanager
+from functools import wraps
 
 # This regular expression replaces the home-cooked parser that was here before.
 # It is much faster, but requires an extra post-processing step to get the
@@ -51,6 +53,36 @@ def split_unquoted_newlines(stmt):
     return outputlines
 
 
+def decode(data, encoding=None):
+    """Decodes *data* with *encoding*.
+
+    Without an encoding UTF-8 is tried first, falling back to
+    ``unicode-escape``.
+    """
+    if encoding:
+        return data.decode(encoding)
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('unicode-escape')
+
+
+def is_utf8(path, chunk_size=64 * 1024):
+    """Checks whether the file at *path* is valid UTF-8.
+
+    The file is read in chunks of *chunk_size* bytes.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
 def remove_quotes(val):
     """Helper that removes surrounding quotes from strings."""
     if val is None:
@@ -67,6 +99,7 @@ def recurse(*cls):
     :return: function
     """
     def wrap(f):
+        @wraps(f)
         def wrapped_f(tlist):
             for sgroup in tlist.get_sublists():
                 if not isinstance(sgroup, cls):
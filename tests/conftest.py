@@ -45,3 +45,39 @@ def get_stream(filepath):
         return open(filepath(filename), encoding=encoding)
 
     return make_stream
+
+
+@pytest.fixture(params=[False, True], ids=['ws-tokens', 'ws-runs'])
+def whitespace_runs(request):
+    """Runs a test with both whitespace modes of the default lexer."""
+    from sqlparse.lexer import Lexer
+
+    lexer = Lexer.get_default_instance()
+    lexer.set_whitespace_runs(request.param)
+    yield request.param
+    lexer.default_initialization()
+
+
+@pytest.fixture()
+def spawned_workers(monkeypatch):
+    """Starts worker processes from scratch instead of forking them."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+
+    from sqlparse import parallel
+
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor', partial(
+        ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
+
+
+@pytest.fixture()
+def zorder_keyword():
+    """Adds ZORDER as a keyword to the default lexer."""
+    from sqlparse import tokens as T
+    from sqlparse.lexer import Lexer
+
+    lexer = Lexer.get_default_instance()
+    lexer.add_keywords({'ZORDER': T.Keyword})
+    yield
+    lexer.default_initialization()
@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sqlparse
+from sqlparse import cache, sql, tokens as T
+from sqlparse.exceptions import SQLParseError
+from sqlparse.lexer import Lexer
+
+
+@pytest.fixture()
+def lru_cache():
+    cache.enable(maxsize=2)
+    yield
+    cache.disable()
+
+
+def test_cache_disabled_by_default():
+    assert not cache.is_enabled()
+    assert cache.info() is None
+    assert sqlparse.format('select 1', keyword_case='upper') == 'SELECT 1'
+
+
+def test_cache_invalid_size():
+    with pytest.raises(SQLParseError):
+        cache.enable(maxsize=0)
+    assert not cache.is_enabled()
+
+
+def test_cache_parse_returns_copies(lru_cache):
+    s = 'select a from foo'
+    first = sqlparse.parse(s)
+    first[0].tokens[0].value = 'delete'
+    first[0].insert_after(first[0].tokens[-1], sql.Token(T.Whitespace, ' '))
+    second = sqlparse.parse(s)
+    assert cache.info()[:2] == (1, 1)
+    assert str(second[0]) == s
+    assert second[0].get_type() == 'SELECT'
+    assert second[0].tokens[0].parent is second[0]
+    assert sqlparse.parse(s)[0] is not second[0]
+
+
+def test_cache_format(lru_cache):
+    s = 'select a from foo'
+    assert sqlparse.format(s, keyword_case='upper') == 'SELECT a FROM foo'
+    assert sqlparse.format(s, keyword_case='upper') == 'SELECT a FROM foo'
+    assert sqlparse.format(s, keyword_case='lower') == s
+    assert sqlparse.format(s, keyword_case='lower') == s
+    assert cache.info() == (2, 2, 0, 2, 2)
+    with pytest.raises(SQLParseError):
+        sqlparse.format(s, keyword_case='foo')
+    assert cache.info().currsize == 2
+
+
+def test_cache_format_hit_skips_setup(lru_cache, monkeypatch):
+    s = 'select a from foo'
+    assert sqlparse.format(s, keyword_case='upper') == 'SELECT a FROM foo'
+    monkeypatch.setattr(sqlparse, 'Formatter', None)
+    assert sqlparse.format(s, keyword_case='upper') == 'SELECT a FROM foo'
+    assert cache.info()[:2] == (1, 1)
+
+
+def test_cache_eviction(lru_cache):
+    for s in ('select 1', 'select 2', 'select 1', 'select 3', 'select 1'):
+        sqlparse.format(s)
+    assert cache.info() == (2, 3, 1, 2, 2)
+    sqlparse.format('select 2')
+    assert cache.info().misses == 4
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 2, 0)
+
+
+def test_cache_not_used_for_streams(lru_cache, filepath):
+    with open(filepath('function.sql')) as f:
+        sqlparse.format(f)
+    assert cache.info() == (0, 0, 0, 2, 0)
+
+
+def test_cache_invalidated_by_lexer(lru_cache):
+    assert sqlparse.parse('foo')[0].tokens[0].ttype is None
+    Lexer.get_default_instance().add_keywords({'FOO': T.Keyword})
+    try:
+        assert sqlparse.parse('foo')[0].tokens[0].ttype is T.Keyword
+    finally:
+        Lexer.get_default_instance().default_initialization()
+    assert sqlparse.parse('foo')[0].tokens[0].ttype is None
+
+
+def test_cache_threads(lru_cache):
+    sqls = [f'select {i % 5} from foo' for i in range(200)]
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(
+            lambda s: sqlparse.format(s, keyword_case='upper'), sqls))
+    assert results == [s.upper().replace('FOO', 'foo') for s in sqls]
+    info = cache.info()
+    assert info.hits + info.misses == len(sqls)
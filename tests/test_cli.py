@@ -187,6 +187,17 @@ def test_cli_single_file_inplace(tmpdir):
     assert "SELECT" in content
 
 
+def test_cli_outfile_is_infile(tmpdir):
+    test_file = tmpdir.join("test.sql")
+    test_file.write("select   *   from   foo")
+
+    result = sqlparse.cli.main([str(test_file), '-o', str(test_file),
+                                '--keywords', 'upper'])
+
+    assert result == 0
+    assert test_file.read() == "SELECT   *   FROM   foo"
+
+
 def test_cli_error_handling_continues(tmpdir, capsys):
     """Test that errors in one file don't stop processing of others."""
     file1 = tmpdir.join("test1.sql")
@@ -204,3 +215,41 @@ def test_cli_error_handling_continues(tmpdir, capsys):
     assert "select * from baz" in file3.read()
     _, err = capsys.readouterr()
     assert "Failed to read" in err
+
+
+def test_cli_jobs(tmpdir, capsys):
+    """Test --jobs formats files in parallel, reporting errors in order."""
+    files = [tmpdir.join(f"test{i}.sql") for i in range(4)]
+    for i, f in enumerate(files):
+        f.write(f"select * from foo{i}")
+    missing = [str(tmpdir.join("missing1.sql")), str(tmpdir.join("missing2.sql"))]
+
+    result = sqlparse.cli.main([str(files[0]), missing[0], str(files[1]),
+                                missing[1], str(files[2]), str(files[3]),
+                                '--in-place', '--keywords', 'upper',
+                                '--jobs', '2'])
+
+    assert result == 1
+    for i, f in enumerate(files):
+        assert f.read() == f"SELECT * FROM foo{i}"
+    _, err = capsys.readouterr()
+    assert err.count("Failed to read") == 2
+    assert err.index("missing1.sql") < err.index("missing2.sql")
+
+
+def test_cli_jobs_invalid(filepath, capsys):
+    path = filepath('function.sql')
+    assert sqlparse.cli.main([path, '--jobs', '0']) == 1
+    _, err = capsys.readouterr()
+    assert "--jobs must be at least 1" in err
+
+
+def test_cli_right_margin(tmpdir):
+    test_file = tmpdir.join("test.sql")
+    test_file.write("select foo, bar, baz from qux where foo = 1")
+
+    result = sqlparse.cli.main([str(test_file), '--in-place',
+                                '--right_margin', '20'])
+
+    assert result == 0
+    assert test_file.read() == "select foo, bar, baz\nfrom qux where\nfoo = 1"
@@ -1,6 +1,9 @@
+import pickle
+
 import pytest
 
 import sqlparse
+from sqlparse import filters, tokens as T
 from sqlparse.exceptions import SQLParseError
 
 
@@ -38,6 +41,28 @@ class TestFormat:
         res = sqlparse.format(sql, identifier_case="upper")
         assert res == 'select * from "foo"."bar"'
 
+    def test_preprocess_filters(self):
+        class Rename:
+            # A stream filter between token filters.
+            def process(self, stream):
+                for ttype, value in stream:
+                    yield ttype, 'BAR' if value == 'FOO' else value
+
+        stack = sqlparse.engine.FilterStack()
+        stack.preprocess = [
+            filters.IdentifierCaseFilter('upper'),
+            filters.TruncateStringFilter(width=2, char='.'),
+            Rename(),
+            filters.KeywordCaseFilter('upper'),
+        ]
+        stack.postprocess.append(filters.SerializerUnicode())
+        sql = "select foo, 'abc' from bar"
+        res = ''.join(stack.run(sql))
+        assert res == "SELECT BAR, 'ab.' FROM BAR"
+        tokens = list(filters.KeywordCaseFilter('lower').process(
+            [(T.Keyword, 'FROM'), (T.Name, 'FOO')]))
+        assert tokens == [(T.Keyword, 'from'), (T.Name, 'FOO')]
+
     def test_strip_comments_single(self):
         sql = 'select *-- statement starts here\nfrom foo'
         res = sqlparse.format(sql, strip_comments=True)
@@ -113,11 +138,55 @@ class TestFormat:
         res = sqlparse.format(sql, strip_comments=True)
         assert res == 'select *\n\nfrom foo'
 
+    def test_strip_comments_preserves_linebreak_grouped(self):
+        # The comment is grouped, its line break is preserved nevertheless.
+        sql = 'select a -- a comment\nfrom foo'
+        res = sqlparse.format(sql, strip_comments=True,
+                              use_space_around_operators=True)
+        assert res == 'select a\nfrom foo'
+
     def test_strip_comments_preserves_whitespace(self):
         sql = 'SELECT 1/*bar*/ AS foo'  # see issue772
         res = sqlparse.format(sql, strip_comments=True)
         assert res == 'SELECT 1 AS foo'
 
+    def test_strip_comments_without_grouping(self):
+        stack = sqlparse.engine.FilterStack()
+        sqlparse.formatter.build_filter_stack(
+            stack, {'strip_comments': True})
+        assert not stack._grouping
+        sql = 'select a/* x */, /*+ hint */b -- y\nfrom foo/* z */'
+        res = sqlparse.format(sql, strip_comments=True)
+        assert res == 'select a , /*+ hint */b\nfrom foo'
+
+    @pytest.mark.parametrize('sql, expected', [
+        ('select a\n-- c1\n-- c2\n-- c3\nfrom t', 'select a\n\nfrom t'),
+        ('select a -- c1\n-- c2\nfrom t', 'select a\nfrom t'),
+        ('select a, -- c1\n  -- c2\n  b from t', 'select a,\n  b from t'),
+    ])
+    def test_strip_comments_runs(self, sql, expected):
+        assert sqlparse.format(sql, strip_comments=True) == expected
+
+    @pytest.mark.parametrize('sql', [
+        'select * /* foo */ from bar',
+        'select a\n  -- c1\n  -- c2\nfrom t',
+        'select a -- c\n as b, c /* x */ as d from t',
+        'select x /* a */ /*+ hint */ -- b\n::int from t',
+        'select f(/* a */ x) -- b\nfrom t -- c\n',
+        '-- a\n/* b */\nselect 1',
+    ])
+    def test_strip_comments_grouped_and_ungrouped(self, sql):
+        def strip(grouped):
+            stack = sqlparse.engine.FilterStack()
+            if grouped:
+                stack.enable_grouping()
+            stack.stmtprocess.append(
+                filters.StripCommentsFilter(grouped))
+            stack.postprocess.append(filters.SerializerUnicode())
+            return ''.join(stack.run(sql))
+
+        assert strip(False) == strip(True)
+
     def test_strip_comments_preserves_hint(self):
         sql = 'select --+full(u)'
         res = sqlparse.format(sql, strip_comments=True)
@@ -138,18 +207,22 @@ class TestFormat:
         res = sqlparse.format(sql, strip_comments=True)
         assert res == sql
 
+    @pytest.mark.usefixtures('whitespace_runs')
     def test_strip_ws(self):
         f = lambda sql: sqlparse.format(sql, strip_whitespace=True)
         s = 'select\n* from      foo\n\twhere  ( 1 = 2 )\n'
         assert f(s) == 'select * from foo where (1 = 2)'
         s = 'select -- foo\nfrom    bar\n'
         assert f(s) == 'select -- foo\nfrom bar'
+        s = 'select a    ,\n  b from t'
+        assert f(s) == 'select a, b from t'
 
     def test_strip_ws_invalid_option(self):
         s = 'select -- foo\nfrom    bar\n'
         with pytest.raises(SQLParseError):
             sqlparse.format(s, strip_whitespace=None)
 
+    @pytest.mark.usefixtures('whitespace_runs')
     def test_preserve_ws(self):
         # preserve at least one whitespace after subgroups
         f = lambda sql: sqlparse.format(sql, strip_whitespace=True)
@@ -175,6 +248,7 @@ class TestFormat:
                 == "SELECT some_column LIKE 'value\\\\\\'\r' WHERE id = 1\n")
 
 
+@pytest.mark.usefixtures('whitespace_runs')
 class TestFormatReindentAligned:
     @staticmethod
     def formatter(sql):
@@ -373,6 +447,7 @@ class TestSpacesAroundOperators:
         assert self.formatter(sql) == 'select a * b - c from table'
 
 
+@pytest.mark.usefixtures('whitespace_runs')
 class TestFormatReindent:
     def test_option(self):
         with pytest.raises(SQLParseError):
@@ -398,6 +473,8 @@ class TestFormatReindent:
         assert f(s) == 'select foo'
         s = 'select foo; -- test\n select bar'
         assert f(s) == 'select foo; -- test\n\nselect bar'
+        s = 'select foo; -- test\n\t   select bar'
+        assert f(s) == 'select foo; -- test\n\nselect bar'
 
     def test_keywords(self):
         f = lambda sql: sqlparse.format(sql, reindent=True)
@@ -679,6 +756,17 @@ class TestOutputFormat:
             "sql2 = ('select 1 '",
             "        'from dual')"])
 
+    def test_python_reindent_groups(self):
+        sql = 'select * from foo where a = 1 and b = 2'
+        f = lambda sql: sqlparse.format(sql, output_format='python',
+                                        reindent=True)
+        assert f(sql) == '\n'.join([
+            "sql = ('select * '",
+            "       'from foo '",
+            "       'where a = 1 '",
+            "       '  and b = 2')"])
+        compile(f(sql), '<string>', 'exec')
+
     def test_php(self):
         sql = 'select * from foo;'
         f = lambda sql: sqlparse.format(sql, output_format='php')
@@ -688,6 +776,9 @@ class TestOutputFormat:
         assert f(sql) == '\n'.join([
             '$sql  = "select * ";',
             '$sql .= "from foo;";'])
+        assert f('select   *   from foo;') == '\n'.join([
+            '$sql  = "select * ";',
+            '$sql .= "from foo;";'])
 
     def test_python_escapes_backslashes(self):
         # GHSA-3496-9g83-7v6x: backslashes must be escaped before quotes so
@@ -771,10 +862,58 @@ def test_format_right_margin_invalid_option(right_margin):
         sqlparse.format('foo', right_margin=right_margin)
 
 
-@pytest.mark.xfail(reason="Needs fixing")
 def test_format_right_margin():
-    # TODO: Needs better test, only raises exception right now
-    sqlparse.format('foo', right_margin="79")
+    sql = ("select a.id, a.name as label, count(b.id) from table_one a "
+           "left join table_two b on b.parent_id = a.id where a.name "
+           "like 'x%'")
+    formatted = sqlparse.format(sql, right_margin="30")
+    assert formatted == '\n'.join([
+        'select a.id, a.name as label,',
+        'count(b.id) from table_one a',
+        'left join table_two b on',
+        'b.parent_id = a.id where',
+        "a.name like 'x%'"])
+    assert sqlparse.format(sql, right_margin=200) == sql
+
+
+def test_format_right_margin_reindent():
+    sql = ("select a, coalesce(b.description, 'none') as description "
+           "from foo where bar = 1")
+    formatted = sqlparse.format(sql, reindent=True, right_margin=20)
+    assert formatted == '\n'.join([
+        'select a,',
+        '       coalesce(b.description,',
+        "       'none') as",
+        '       description',
+        'from foo',
+        'where bar = 1'])
+
+
+def test_format_right_margin_function_call():
+    sql = 'select abc, count(some_long_column) from t'
+    assert sqlparse.format(sql, right_margin=17) == \
+        'select abc, count(some_long_column)\nfrom t'
+    sql = 'select f(aaaa, bbbb) from t'
+    assert sqlparse.format(sql, right_margin=12) == \
+        'select f(aaaa,\nbbbb) from t'
+
+
+def test_format_right_margin_dotted_names():
+    sql = 'select a.bbbbbbbbbbbb from t'
+    assert sqlparse.format(sql, right_margin=10) == \
+        'select\na.bbbbbbbbbbbb\nfrom t'
+    sql = 'select abc, x.y::integer from t'
+    assert sqlparse.format(sql, right_margin=14) == \
+        'select abc,\nx.y::integer\nfrom t'
+    sql = 'select a.b as cccccccccc from t'
+    assert sqlparse.format(sql, right_margin=11) == \
+        'select a.b\nas\ncccccccccc\nfrom t'
+
+
+def test_format_right_margin_keeps_long_tokens():
+    sql = "select 'a very long string literal' from foo"
+    formatted = sqlparse.format(sql, right_margin=10)
+    assert formatted == "select\n'a very long string literal'\nfrom foo"
 
 
 def test_format_json_ops():  # issue542
@@ -795,8 +934,90 @@ def test_compact(sql, expected_normal, expected_compact):  # issue783
     assert formatted_compact == expected_compact
 
 
+@pytest.mark.usefixtures('whitespace_runs')
 def test_strip_ws_removes_trailing_ws_in_groups():  # issue782
     formatted = sqlparse.format('( where foo = bar  ) from',
                                 strip_whitespace=True)
     expected = '(where foo = bar) from'
     assert formatted == expected
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_format_many(processes):
+    sqls = ['select a from b where c = %d' % i for i in range(10)]
+    formatted = sqlparse.format_many(sqls, processes=processes, chunksize=3,
+                                     keyword_case='upper')
+    assert formatted == [sqlparse.format(s, keyword_case='upper')
+                         for s in sqls]
+
+
+@pytest.mark.usefixtures('spawned_workers', 'zorder_keyword')
+def test_format_many_custom_keywords():
+    sqls = ['select * from t zorder by a', 'select zorder from t']
+    assert sqlparse.format_many(sqls, processes=2, keyword_case='upper') == [
+        'SELECT * FROM t ZORDER BY a', 'SELECT ZORDER FROM t']
+
+
+def test_format_many_invalid_option():
+    with pytest.raises(SQLParseError):
+        sqlparse.format_many(['select 1'], keyword_case='foo')
+
+
+def test_formatter():
+    formatter = sqlparse.Formatter(keyword_case='upper', reindent=True)
+    sqls = ['select a, b from foo; select 1', 'select c from bar']
+    formatted = [sqlparse.format(s, keyword_case='upper', reindent=True)
+                 for s in sqls]
+    assert [formatter.format(s) for s in sqls] == formatted
+    assert formatter.format_many(sqls) == formatted
+    assert formatter.format_many(sqls) == formatted
+
+
+def test_formatter_resets_filters():
+    formatter = sqlparse.Formatter(output_format='python')
+    assert formatter.format('select 1; select 2') == \
+        "sql = 'select 1; '\nsql2 = 'select 2'"
+    assert formatter.format('select 3') == "sql = 'select 3'"
+
+
+def test_formatter_pickle():
+    formatter = sqlparse.Formatter(keyword_case='upper')
+    formatter = pickle.loads(pickle.dumps(formatter))
+    assert repr(formatter) == "Formatter(keyword_case='upper')"
+    assert formatter.format('select 1') == 'SELECT 1'
+
+
+def test_formatter_invalid_option():
+    with pytest.raises(SQLParseError):
+        sqlparse.Formatter(keyword_case='foo')
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("select * from foo where id in (1, 2, 3) and name = 'x' -- c\n",
+     'SELECT * FROM foo WHERE id IN (...) AND name = ?'),
+    ("insert into t (a, b) values (1, 'a'), (2, 'b'), (-3, now())",
+     'INSERT INTO t(a, b) VALUES (...), (?, now())'),
+    ('select a-1, -1, f( x ) from t where x::int > 1.5e3 limit 10',
+     'SELECT a - ?, ?, f(x) FROM t WHERE x::INT > ? LIMIT ?'),
+    ('select $$abc$$, :name, %s, 0xFF from s.t group  by\n a',
+     'SELECT ?, ?, ?, ? FROM s.t GROUP BY a'),
+    ('select 1 from t where a in (select b from c) or b in ()',
+     'SELECT ? FROM t WHERE a IN (SELECT b FROM c) OR b IN ()'),
+    ('update t set a = 1; select "x" from t;',
+     'UPDATE t SET a = ?; SELECT "x" FROM t'),
+])
+def test_fingerprint(sql, expected):
+    text, digest = sqlparse.fingerprint(sql)
+    assert text == expected
+    assert len(digest) == 16
+    assert sqlparse.fingerprint(expected) == (text, digest)
+
+
+def test_fingerprint_equal_for_equal_queries():
+    a = sqlparse.fingerprint(
+        "SELECT *\n  FROM foo\n WHERE id IN (?)  AND name='yy';")
+    b = sqlparse.fingerprint(
+        "/* hi */ select * from foo where id in (1, 2, 3) and name = 'x'")
+    c = sqlparse.fingerprint("select * from foo where id in (1) or name = 'x'")
+    assert a == b
+    assert a[1] != c[1]
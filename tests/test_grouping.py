@@ -1,7 +1,9 @@
 import pytest
 
 import sqlparse
-from sqlparse import sql, tokens as T
+from sqlparse import formatter, sql, tokens as T
+from sqlparse.engine import FilterStack, grouping
+from sqlparse.exceptions import SQLParseError
 
 
 def test_grouping_parenthesis():
@@ -685,3 +687,46 @@ def test_grouping_as_cte():
 def test_grouping_create_table():
     p = sqlparse.parse("create table db.tbl (a string)")[0].tokens
     assert p[4].value == "db.tbl"
+
+
+def test_grouping_levels():
+    passes = grouping.passes('brackets')
+    assert passes == (grouping.group_brackets, grouping.group_parenthesis)
+    # Dependencies are added and everything runs in the usual order.
+    passes = grouping.passes([grouping.group_functions], 'comments')
+    assert passes == (
+        grouping.group_comments, grouping.group_brackets,
+        grouping.group_parenthesis, grouping.group_case, grouping.group_if,
+        grouping.group_for, grouping.group_begin, grouping.group_over,
+        grouping.group_functions, grouping.align_comments)
+    assert grouping.passes('full') == grouping.GROUPING_PASSES
+    with pytest.raises(SQLParseError):
+        grouping.passes('foo')
+    with pytest.raises(SQLParseError):
+        grouping.passes([len])
+
+
+def test_grouping_level_brackets():
+    stack = FilterStack()
+    stack.enable_grouping('brackets')
+    stmt, = stack.run('select f(a), b[1] from foo where x = 1')
+    assert [type(token).__name__ for token in stmt.get_sublists()] == [
+        'Parenthesis', 'SquareBrackets']
+    assert str(stmt) == 'select f(a), b[1] from foo where x = 1'
+    stack.enable_grouping('full')
+    stmt, = stack.run('select f(a) from foo')
+    assert isinstance(stmt.tokens[2], sql.Function)
+
+
+@pytest.mark.parametrize('options, level', [
+    ({'keyword_case': 'upper'}, ()),
+    ({'use_space_around_operators': True}, ('operators',)),
+    ({'strip_whitespace': True}, ('identifiers',)),
+    ({'strip_whitespace': True, 'use_space_around_operators': True},
+     ('operators', 'identifiers')),
+    ({'reindent': True}, ('full',)),
+])
+def test_grouping_level_format(options, level):
+    stack = FilterStack()
+    formatter.build_filter_stack(stack, formatter.validate_options(options))
+    assert stack._grouping == grouping.passes(*level)
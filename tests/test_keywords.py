@@ -11,3 +11,23 @@ class TestSQLREGEX:
     def test_float_numbers(self, number):
         ttype = next(tt for action, tt in Lexer.get_default_instance()._SQL_REGEX if action(number))
         assert tokens.Number.Float == ttype
+
+
+def test_keyword_precedence():
+    lex = Lexer()
+    lex.clear()
+    lex.add_keywords({'FOO': tokens.Keyword.DML})
+    lex.add_keywords({'FOO': tokens.Keyword, 'BAR': tokens.Keyword})
+    assert lex.is_keyword('foo') == (tokens.Keyword.DML, 'foo')
+    assert lex.is_keyword('Bar') == (tokens.Keyword, 'Bar')
+    assert lex.is_keyword('baz') == (tokens.Name, 'baz')
+
+
+def test_keyword_lookup_invalidated():
+    lex = Lexer()
+    lex.clear()
+    assert lex.is_keyword('foo') == (tokens.Name, 'foo')
+    lex.add_keywords({'FOO': tokens.Keyword})
+    assert lex.is_keyword('foo') == (tokens.Keyword, 'foo')
+    lex.clear()
+    assert lex.is_keyword('foo') == (tokens.Name, 'foo')
@@ -5,6 +5,7 @@ import pytest
 
 import sqlparse
 from sqlparse import sql, tokens as T, keywords
+from sqlparse.filters import StripWhitespaceFilter
 from sqlparse.lexer import Lexer
 
 
@@ -336,6 +337,50 @@ def test_get_token_at_offset():
     assert p.get_token_at_offset(10) == p.tokens[4]
 
 
+def test_token_positions():
+    s = 'select a.b, f(x) from t;\n  select 1'
+    for stmt in sqlparse.parse(s):
+        for token in stmt.flatten():
+            assert s[token.pos:token.pos + len(token.value)] == token.value
+    stmt = sqlparse.parse(s)[1]
+    assert stmt.pos == s.index(';') + 1
+    assert stmt.tokens[-1].pos == len(s) - 1
+
+
+def test_get_token_at_offset_nested():
+    s = 'select a.b, f(x) from t; select 1'
+    first, second = sqlparse.parse(s)
+    assert first.get_token_at_offset(8).value == '.'
+    assert first.get_token_at_offset(14).value == 'x'
+    assert first.get_token_at_offset(len(str(first))) is None
+    assert second.get_token_at_offset(7).value == '1'
+    # relative to the token list it's called on
+    identifier = first.tokens[2].tokens[0]
+    assert identifier.get_token_at_offset(2).value == 'b'
+
+
+def test_get_token_at_offset_without_positions():
+    p = sql.TokenList([sql.Token(T.Name, 'ab'), sql.Token(T.Name, 'c')])
+    assert p.pos is None
+    assert p.get_token_at_offset(1).value == 'ab'
+    assert p.get_token_at_offset(2).value == 'c'
+    assert p.get_token_at_offset(3) is None
+
+
+def test_get_token_at_offset_after_filter():
+    stmt = sqlparse.parse('select a   ,   b from t')[0]
+    StripWhitespaceFilter().process(stmt)
+    s = str(stmt)
+    assert s == 'select a, b from t'
+    assert stmt.pos is None
+    for offset, char in enumerate(s):
+        token = stmt.get_token_at_offset(offset)
+        assert char in token.value
+    assert stmt.get_token_at_offset(8).value == ','
+    assert stmt.get_token_at_offset(12).value == 'from'
+    assert stmt.get_token_at_offset(len(s)) is None
+
+
 def test_pprint():
     p = sqlparse.parse('select a0, b0, c0, d0, e0 from '
                        '(select * from dual) q0 where 1=1 and 2=2')[0]
@@ -641,3 +686,102 @@ def test_json_operators(sql):
     assert len(p) == 1
     assert len(p[0].tokens) == 1
     assert p[0].tokens[0].ttype == sqlparse.tokens.Operator
+
+
+def test_parse_many():
+    sqls = ['select 1; select 2', 'insert into foo values (1)', '']
+    parsed = sqlparse.parse_many(sqls, processes=2)
+    assert [[str(stmt) for stmt in stmts] for stmts in parsed] == [
+        ['select 1; ', 'select 2'], ['insert into foo values (1)'], []]
+    assert parsed[1][0].get_type() == 'INSERT'
+    assert parsed[1][0].tokens[-1].parent is parsed[1][0]
+
+
+@pytest.mark.parametrize('ttype, value', [
+    (T.Keyword, 'select'),
+    (T.Keyword.DML, 'Insert'),
+    (T.Newline, '\n'),
+    (T.Whitespace, ' '),
+    (T.Name, 'foo'),
+])
+def test_token_make(ttype, value):
+    attrs = sql.Token.__slots__
+    token = sql.Token(ttype, value, 3)
+    made = sql.Token._make(ttype, value, 3)
+    assert [getattr(made, a) for a in attrs] == [
+        getattr(token, a) for a in attrs]
+
+
+def test_tokenlist_value_invalidated():
+    stmt = sqlparse.parse('select foo(a, b) from bar')[0]
+    func = stmt.tokens[2]
+    assert stmt.value == 'select foo(a, b) from bar'
+    params = func.tokens[1].tokens[1]
+    params.insert_after(params.tokens[-1], sql.Token(T.Whitespace, ' '))
+    assert func.value == 'foo(a, b )'
+    assert stmt.value == 'select foo(a, b ) from bar'
+    assert stmt.normalized == stmt.value
+
+
+@pytest.mark.parametrize('read_before', [False, True])
+def test_tokenlist_value_invalidated_by_filters(read_before):
+    stmt = sqlparse.parse('select a   ,   b from t')[0]
+    idlist = stmt.tokens[2]
+    assert isinstance(idlist, sql.IdentifierList)
+    if read_before:
+        assert idlist.value == 'a   ,   b'
+    StripWhitespaceFilter().process(stmt)
+    assert idlist.value == 'a, b'
+    assert stmt.value == str(stmt) == 'select a, b from t'
+
+
+def test_tokenlist_value_invalidated_by_assignment():
+    stmt = sqlparse.parse('select foo(a, b) from bar')[0]
+    func = stmt.tokens[2]
+    assert stmt.value == 'select foo(a, b) from bar'
+    func.tokens[0].tokens[0].value = 'baz'
+    assert stmt.value == 'select baz(a, b) from bar'
+    func.tokens = func.tokens[:1]
+    assert stmt.value == 'select baz from bar'
+    del stmt.tokens[1:]
+    stmt._invalidate_value()
+    assert stmt.value == 'select'
+
+
+@pytest.mark.parametrize('s', [
+    'select a, b as c from t where a = 1 and f(b) > 2',
+    '-- comment\nwith x as (select 1) insert into foo select * from x',
+    'create table foo (id int /* key */, name varchar(10))',
+    '  ',
+])
+def test_parse_compact(s):
+    def check(token, view):
+        assert view.cls is type(token)
+        assert view.ttype == token.ttype
+        assert view.value == token.value
+        assert view.normalized == token.normalized
+        assert [t.value for t in view.flatten()] == [
+            t.value for t in token.flatten()]
+        if not token.is_group:
+            assert view.tokens == []
+            return
+        assert [t.cls for t in view.get_sublists()] == [
+            type(t) for t in token.get_sublists()]
+        for idx in range(len(token.tokens)):
+            for skip_cm in (False, True):
+                nidx, ntoken = view.token_next(idx, skip_cm=skip_cm)
+                assert nidx == token.token_next(idx, skip_cm=skip_cm)[0]
+                pidx, ptoken = view.token_prev(idx, skip_cm=skip_cm)
+                assert pidx == token.token_prev(idx, skip_cm=skip_cm)[0]
+        for child, child_view in zip(token.tokens, view.tokens, strict=True):
+            assert child_view.parent == view
+            check(child, child_view)
+
+    stmts = sqlparse.parse(s)
+    compact_stmts = sqlparse.parse_compact(s)
+    assert len(compact_stmts) == len(stmts)
+    for stmt, compact_stmt in zip(stmts, compact_stmts):
+        assert str(compact_stmt) == str(stmt)
+        assert compact_stmt.get_type() == stmt.get_type()
+        assert compact_stmt.root.parent is None
+        check(stmt, compact_stmt.root)
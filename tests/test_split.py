@@ -138,6 +138,29 @@ def test_split_unicode_parsestream():
     assert str(stmts[0]) == 'SELECT ö'
 
 
+def test_split_path(tmp_path):
+    path = tmp_path / 'test.sql'
+    path.write_text('select * from foo;\nselect ö;\n', encoding='utf-8')
+    assert sqlparse.split(path) == ['select * from foo;', 'select ö;']
+    assert len(sqlparse.parse(path)) == 2
+    assert len(list(sqlparse.parsestream(path))) == 2
+    assert sqlparse.format(path, keyword_case='upper') == (
+        'SELECT * FROM foo;\nSELECT ö;')
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_split_path_not_utf8(tmp_path, processes):
+    data = 'select * from foo;\nselect \'ö\';\n'.encode('latin-1')
+    path = tmp_path / 'test.sql'
+    path.write_bytes(data)
+    expected = sqlparse.split(data)
+    assert sqlparse.split(path, processes=processes) == expected
+    assert [str(s) for s in sqlparse.parse(path)] == [
+        str(s) for s in sqlparse.parse(data)]
+    assert sqlparse.split(path, encoding='latin-1') == [
+        'select * from foo;', "select 'ö';"]
+
+
 def test_split_simple():
     stmts = sqlparse.split('select * from foo; select * from bar;')
     assert len(stmts) == 2
@@ -374,3 +397,68 @@ def test_split_standalone_for_update():
     assert stmts[1] == "SELECT 3;"
 
 
+@pytest.mark.parametrize('strip_semicolon', [False, True])
+def test_split_offsets_match_statements(load_file, strip_semicolon):
+    sql = load_file('function_psql4.sql') + '\nselect 1;;\n -- foo\nselect 2'
+    stack = sqlparse.engine.FilterStack(strip_semicolon=strip_semicolon)
+    expected = [str(stmt).strip() for stmt in stack.run(sql)]
+    spans = sqlparse.split_offsets(sql, strip_semicolon=strip_semicolon)
+    assert [sql[start:end] for start, end in spans] == expected
+
+
+def test_split_offsets_with_type():
+    sql = ('  select 1;\n-- comment\ninsert into foo values (1);\n'
+           'with x as (select 1) update foo set a = 1;\nfoo;\n-- bar\n')
+    spans = sqlparse.split_offsets(sql, with_type=True)
+    assert [(sql[start:end], type_) for start, end, type_ in spans] == [
+        ('select 1;', 'SELECT'),
+        ('-- comment\ninsert into foo values (1);', 'INSERT'),
+        ('with x as (select 1) update foo set a = 1;', 'UPDATE'),
+        ('foo;', 'UNKNOWN'),
+        ('-- bar', 'UNKNOWN'),
+    ]
+    assert [t for _, _, t in spans] == [
+        stmt.get_type() for stmt in sqlparse.parse(sql)]
+
+
+def test_split_many():
+    sqls = ['select 1; select 2;', 'select 3']
+    assert sqlparse.split_many(sqls, strip_semicolon=True) == [
+        ['select 1', 'select 2'], ['select 3']]
+
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_split_offsets_parallel(monkeypatch, processes):
+    from sqlparse.engine import statement_splitter
+    # Cuts within literals, comments and blocks have to be reconciled.
+    sql = ("select 1;\nselect 'a;\nb';\nselect $$x;\n$$;\n/* c;\n */ "
+           "select 2;\ncreate procedure p as begin\n select 1;\n select 2;"
+           "\n end;\nselect [a;\n b] from t;\n-- x;\nselect 3\n")
+    monkeypatch.setattr(statement_splitter, 'PARALLEL_CHUNK_SIZE', 5)
+    expected = sqlparse.split_offsets(sql, with_type=True)
+    assert statement_splitter.split_offsets_parallel(
+        sql, processes, with_type=True) == expected
+    assert sqlparse.split(sql, processes=processes) == sqlparse.split(sql)
+
+
+@pytest.mark.usefixtures('spawned_workers')
+def test_split_offsets_parallel_custom_keywords(monkeypatch):
+    from sqlparse.engine import statement_splitter
+    from sqlparse.lexer import Lexer
+    sql = 'optimize t;\nselect 1;\noptimize u;\n'
+    monkeypatch.setattr(statement_splitter, 'PARALLEL_CHUNK_SIZE', 5)
+    Lexer.get_default_instance().add_keywords(
+        {'OPTIMIZE': sqlparse.tokens.Keyword.DML})
+    try:
+        offsets = statement_splitter.split_offsets_parallel(
+            sql, 2, with_type=True)
+    finally:
+        Lexer.get_default_instance().default_initialization()
+    assert [t for _, _, t in offsets] == ['OPTIMIZE', 'SELECT', 'OPTIMIZE']
+
+
+def test_split_parallel_path(tmp_path):
+    path = tmp_path / 'script.sql'
+    path.write_text('select 1;\nselect 2;\n', encoding='utf-8')
+    assert sqlparse.split(path, processes=2) == ['select 1;', 'select 2;']
@@ -1,3 +1,4 @@
+import pickle
 import types
 from io import StringIO
 
@@ -19,6 +20,23 @@ def test_tokenize_simple():
     assert tokens[-1] == (T.Punctuation, ';')
 
 
+def test_token_type_containment():
+    assert T.Keyword.DML in T.Keyword
+    assert T.Keyword in T.Keyword
+    assert T.Keyword not in T.Keyword.DML
+    assert T.Name not in T.Keyword
+    assert T.Newline in T.Text
+    assert None not in T.Keyword
+    assert ('Keyword', 'DML') in T.Keyword
+    assert T.Keyword.DML in (T.Keyword.DML, T.Keyword.DDL)
+    assert T.Keyword.DML not in (T.Keyword, T.Name)
+
+
+def test_token_type_pickle():
+    assert pickle.loads(pickle.dumps(T.Keyword.DML)) is T.Keyword.DML
+    assert pickle.loads(pickle.dumps(T.Token)) is T.Token
+
+
 def test_tokenize_backticks():
     s = '`foo`.`bar`'
     tokens = list(lexer.tokenize(s))
@@ -139,6 +157,27 @@ def test_stream_error():
     assert tokens[1][0] == T.Error
 
 
+@pytest.mark.parametrize('s', [
+    "SELECT 'a;\nb';\nSELECT 1;\r\nSELECT 2;\n",
+    "SELECT $$a;\nb$$;\n/* c;\n*/ SELECT 1;\n",
+    'SELECT "a;\nb", [c;\nd];\nSELECT 1; -- x\nSELECT 2;\n\n',
+    "SELECT 'a;\nb;\nc",
+    "foo;\n.bar;\n",
+])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 64])
+def test_stream_chunks(monkeypatch, s, chunk_size):
+    monkeypatch.setattr(lexer, 'CHUNK_SIZE', chunk_size)
+    assert list(lexer.tokenize(StringIO(s))) == list(lexer.tokenize(s))
+
+
+def test_stream_read_in_chunks(monkeypatch):
+    monkeypatch.setattr(lexer, 'CHUNK_SIZE', 16)
+    stream = StringIO('SELECT 1;\n' * 100)
+    tokens = lexer.tokenize(stream)
+    assert next(tokens) == (T.Keyword.DML, 'SELECT')
+    assert stream.tell() == 16
+
+
 @pytest.mark.parametrize('expr', [
     'JOIN',
     'LEFT JOIN',
@@ -273,3 +312,128 @@ def test_cli_commands():
 ])
 def test_delimiters_in_strings_and_comments(sql, expected):
     assert expected in list(lexer.tokenize(sql))
+
+
+def test_custom_regex_priority():
+    # Patterns are tried in the order given, so an earlier pattern wins
+    # even where a later one would match a longer text.
+    lex = lexer.Lexer()
+    lex.set_SQL_REGEX([
+        (r'\s+', T.Whitespace),
+        (r'ab', T.Keyword),
+        (r'\w+', T.Name),
+    ])
+    assert list(lex.get_tokens('abc ab')) == [
+        (T.Keyword, 'ab'), (T.Name, 'c'),
+        (T.Whitespace, ' '), (T.Keyword, 'ab')]
+
+
+def test_custom_regex_with_backreference():
+    # Numbered backreferences keep working although the patterns around
+    # them are compiled into a single alternation.
+    lex = lexer.Lexer()
+    lex.set_SQL_REGEX([
+        (r'\s+', T.Whitespace),
+        (r'(["\'])(.*?)\1', T.String),
+        (r'(\w)\w*', T.Name),
+    ])
+    assert list(lex.get_tokens('"a\'b" x')) == [
+        (T.String, '"a\'b"'), (T.Whitespace, ' '), (T.Name, 'x')]
+    assert list(lex.get_tokens("'q")) == [
+        (T.Error, "'"), (T.Name, 'q')]
+
+
+@pytest.mark.parametrize('s', [
+    "SELECT a.b, -1.5e3, 0x1F, .5 FROM `t` WHERE x <> 'y''z' -- c\n",
+    'select "ÀÜ", ´quoted´, @var, ##tmp, :name, ?, %s, %(p)s, $1 from t',
+    'CREATE OR REPLACE VIEW v AS SELECT * FROM t ORDER BY a DESC NULLS LAST',
+    "x::int, a->>'b', c #>> '{d}', \\copy, [bracket], arr[1], ::\t\x0b",
+    'straße ÆØÅ KELVIN ſelect ı',
+])
+def test_tokenize_first_char_dispatch(s):
+    # Patterns are only tried on the characters they can start with.
+    # Result has to be the same as trying every pattern in order.
+    lex = lexer.Lexer.get_default_instance()
+    expected = []
+    pos = 0
+    while pos < len(s):
+        for rexmatch, action in lex._SQL_REGEX:
+            m = rexmatch(s, pos)
+            if m:
+                if action is sqlparse.keywords.PROCESS_AS_KEYWORD:
+                    expected.append(lex.is_keyword(m.group()))
+                else:
+                    expected.append((action, m.group()))
+                pos = m.end()
+                break
+        else:
+            expected.append((T.Error, s[pos]))
+            pos += 1
+    assert list(lex.get_tokens(s)) == expected
+
+
+def test_custom_regex_lookbehind():
+    # The first character of a match can't be derived from a pattern
+    # that starts with a lookbehind over text before the position.
+    lex = lexer.Lexer()
+    lex.set_SQL_REGEX([
+        (r'(?<=\.)x', T.Name.Builtin),
+        (r'\W', T.Punctuation),
+        (r'\w', T.Name),
+    ])
+    assert list(lex.get_tokens('x.x')) == [
+        (T.Name, 'x'), (T.Punctuation, '.'), (T.Name.Builtin, 'x')]
+
+
+def test_custom_regex_empty_match():
+    # A pattern matching the empty string mustn't hide the ones after it.
+    lex = lexer.Lexer()
+    lex.set_SQL_REGEX([
+        (r'x*', T.Name),
+        (r'b', T.Keyword),
+        (r'\s+', T.Whitespace),
+        (r'.', T.Other),
+    ])
+    assert list(lex.get_tokens('b x')) == [
+        (T.Keyword, 'b'), (T.Whitespace, ' '), (T.Name, 'x')]
+
+
+def test_tokenize_whitespace_runs():
+    lex = lexer.Lexer()
+    lex.default_initialization()
+    s = 'select  a,\n\t  b \r\n  from t'
+    assert list(lex.get_tokens(s))[:4] == [
+        (T.Keyword.DML, 'select'), (T.Whitespace, ' '),
+        (T.Whitespace, ' '), (T.Name, 'a')]
+
+    lex.set_whitespace_runs()
+    tokens = list(lex.get_tokens(s))
+    assert tokens == [
+        (T.Keyword.DML, 'select'), (T.Whitespace, '  '), (T.Name, 'a'),
+        (T.Punctuation, ','), (T.Newline, '\n'), (T.Whitespace, '\t  '),
+        (T.Name, 'b'), (T.Whitespace, ' '), (T.Newline, '\r\n'),
+        (T.Whitespace, '  '), (T.Keyword, 'from'), (T.Whitespace, ' '),
+        (T.Name, 't')]
+
+    lex.default_initialization()
+    assert len(list(lex.get_tokens(s))) > len(tokens)
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'reindent': True},
+    {'reindent_aligned': True},
+    {'strip_comments': True, 'strip_whitespace': True},
+    {'reindent': True, 'output_format': 'php'},
+])
+def test_whitespace_runs_format(options):
+    s = ('select  a,   b  from  t   where  x = 1;   -- note\n'
+         '    insert   into  t   values  (1,   2);    ')
+    expected = sqlparse.format(s, **options)
+    lex = lexer.Lexer.get_default_instance()
+    try:
+        lex.set_whitespace_runs()
+        assert sqlparse.format(s, **options) == expected
+        assert len(sqlparse.split(s)) == 2
+    finally:
+        lex.default_initialization()